@@ -0,0 +1,80 @@
+"""Generate, de-duplicate and rank several alternative timetables for one upload.
+
+Each alternative is the normal scheduler run with a different seed (course
+order, day order and ties between slot groups are shuffled); seed None is
+the default deterministic schedule. Runs happen in worker processes and come
+back packed (session_record.pack_schedule) to keep the transfer small.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from optimizer import optimize_schedule, quality_penalties
+from scheduler import TimetableScheduler
+from session_record import pack_schedule, unpack_schedule
+from timegrid import grid_for
+
+# placed hours matter more than comfort: one unplaced hour outweighs this much quality score
+UNPLACED_HOUR_WEIGHT = 10.0
+
+
+def _signature(schedule):
+    return {(s.course_code, s.batch, s.day, s.time) for sessions in schedule.values() for s in sessions}
+
+
+def similarity(a, b):
+    """Jaccard similarity of two schedules' (course, batch, day, time) placements"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _run_alternative(courses, slot_master, seed, optimize_seconds, previous=None):
+    grid = grid_for(slot_master)
+    scheduler = TimetableScheduler(courses, slot_master, seed=seed, grid=grid, previous=previous)
+    schedule = scheduler.generate_schedule()
+    stats = scheduler.get_stats()
+    if optimize_seconds > 0:
+        schedule, stats['optimizer'] = optimize_schedule(schedule, slot_master, time_limit=optimize_seconds,
+                                                         seed=seed or 0,
+                                                         faculty_unavailable=scheduler.faculty_unavailable,
+                                                         grid=grid)
+    return seed, pack_schedule(schedule), stats
+
+
+def generate_alternatives(courses, slot_master, k=4, workers=None, max_similarity=0.9, optimize_seconds=0,
+                          previous=None):
+    """Return up to k distinct alternatives, best first.
+
+    previous (sessions from load_previous_schedule) warm-starts every alternative,
+    so they only differ in the courses that changed since that timetable.
+
+    Each entry is {'seed', 'schedule', 'stats', 'quality', 'score'}; score is
+    quality score + UNPLACED_HOUR_WEIGHT * unplaced hours (lower is better).
+    Alternatives at least max_similarity alike to a better one are dropped.
+    """
+    seeds = [None] + list(range(1, k))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        runs = list(pool.map(_run_alternative, [courses] * k, [slot_master] * k, seeds,
+                             [optimize_seconds] * k, [previous] * k))
+
+    grid = grid_for(slot_master)
+    candidates = []
+    for seed, packed, stats in runs:
+        schedule = unpack_schedule(packed)
+        quality = quality_penalties(schedule, grid=grid)
+        candidates.append({
+            'seed': seed,
+            'schedule': schedule,
+            'stats': stats,
+            'quality': quality,
+            'score': quality['score'] + UNPLACED_HOUR_WEIGHT * stats['unplaced_hours'],
+        })
+    candidates.sort(key=lambda c: (c['score'], c['seed'] is not None, c['seed'] or 0))
+
+    kept, signatures = [], []
+    for candidate in candidates:
+        signature = _signature(candidate['schedule'])
+        if any(similarity(signature, other) >= max_similarity for other in signatures):
+            continue
+        kept.append(candidate)
+        signatures.append(signature)
+    return kept
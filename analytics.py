@@ -0,0 +1,151 @@
+"""Workload and utilization analytics for a finished timetable.
+
+The schedule is turned once into occupancy arrays of shape
+(entity, day, cell), over the shared TimeGrid, for faculty, batches and
+slot-master slots. Every figure is then a NumPy reduction over those
+arrays, so institute-wide timetables cost a few array passes rather than
+nested Python loops:
+
+    utilization   used / offered slots per (day, cell), plus a busy-batch heatmap
+    batch gaps    idle cells between a batch's first and last class of each day
+    faculty load  hours, teaching days, busiest day; spread (std, CV, max/mean)
+    slot groups   fill rate of every slot group (A3, B3, LAB SLOT:J, ...)
+"""
+import numpy as np
+import pandas as pd
+
+from session_record import schedule_from_dicts, time_to_minutes
+from timegrid import grid_for
+
+
+def _cells(grid, starts, ends):
+    """Expand [start, end) minutes per row into (row, cell) pairs, vectorized"""
+    first = np.clip((starts - grid.start) // grid.slot_minutes, 0, grid.slots_per_day)
+    last = np.clip(-(-(ends - grid.start) // grid.slot_minutes), 0, grid.slots_per_day)
+    lengths = np.maximum(last - first, 0)
+    rows = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return rows, first[rows] + offsets
+
+
+def occupancy(names, days, starts, ends, grid):
+    """Count array (entity, day, cell) for rows of entity name, day name and [start, end) minutes.
+
+    Returns (entity names, array); rows on days outside the grid are ignored.
+    """
+    entities, entity_index = np.unique(np.asarray(names, dtype=object).astype(str), return_inverse=True)
+    day_index = np.array([grid.day_index.get(day, -1) for day in days], dtype=np.int64)
+    counts = np.zeros((len(entities), len(grid.days), grid.slots_per_day), dtype=np.int32)
+    rows, cells = _cells(grid, np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64))
+    keep = day_index[rows] >= 0
+    rows, cells = rows[keep], cells[keep]
+    np.add.at(counts, (entity_index[rows], day_index[rows], cells), 1)
+    return list(entities), counts
+
+
+def idle_gaps(busy):
+    """Idle cells between first and last busy cell, per (entity, day); busy is a boolean array"""
+    cells = busy.shape[-1]
+    any_busy = busy.any(axis=-1)
+    first = busy.argmax(axis=-1)
+    last = cells - 1 - busy[..., ::-1].argmax(axis=-1)
+    return np.where(any_busy, last - first + 1 - busy.sum(axis=-1), 0)
+
+
+def _rounded(array, digits=3):
+    """NaN-safe nested lists for JSON"""
+    return [[None if np.isnan(v) else round(float(v), digits) for v in row] for row in array]
+
+
+def analyze(schedule, slot_master, grid=None):
+    """All utilization figures for a schedule as plain, JSON-ready data"""
+    grid = grid or grid_for(slot_master)
+    hours_per_cell = grid.slot_minutes / 60
+    sessions = [s for group in schedule_from_dicts(schedule).values() for s in group]
+    days = [s.day for s in sessions]
+    starts = [s.start for s in sessions]
+    ends = [s.end for s in sessions]
+
+    faculty, faculty_occ = occupancy([s.faculty for s in sessions], days, starts, ends, grid)
+    # a batch sits in one course of an elective basket, so parallel basket sessions count once
+    batch_sessions = list({(s.batch, s.basket, s.day, s.start, s.end) if s.basket else id(s): s
+                           for s in sessions}.values())
+    batches, batch_occ = occupancy([s.batch for s in batch_sessions], [s.day for s in batch_sessions],
+                                   [s.start for s in batch_sessions], [s.end for s in batch_sessions], grid)
+
+    # slots offered vs used, per (slot, day, cell)
+    codes = slot_master['SlotCode'].astype(str).tolist()
+    slot_codes, slot_occ = occupancy(codes, slot_master['Day'].tolist(),
+                                     [time_to_minutes(t) for t in slot_master['StartTime']],
+                                     [time_to_minutes(t) for t in slot_master['EndTime']], grid)
+    used_codes = {s.slot for s in sessions if s.slot}
+    used = np.array([code in used_codes for code in slot_codes], dtype=bool)
+    offered_cells = slot_occ.sum(axis=0)
+    used_cells = slot_occ[used].sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        utilization = np.where(offered_cells > 0, used_cells / offered_cells, np.nan)
+
+    # batches
+    batch_busy = batch_occ > 0
+    gaps = idle_gaps(batch_busy)
+    batch_rows = [{
+        'batch': name,
+        'hours': float(batch_occ[i].sum() * hours_per_cell),
+        'idle_gap_hours': float(gaps[i].sum() * hours_per_cell),
+        'idle_gap_hours_by_day': dict(zip(grid.days, (gaps[i] * hours_per_cell).tolist())),
+        'clash_cells': int((batch_occ[i] > 1).sum()),
+    } for i, name in enumerate(batches)]
+
+    # faculty
+    daily = faculty_occ.sum(axis=2) * hours_per_cell              # (faculty, day) hours
+    hours = daily.sum(axis=1)
+    teaching_days = (daily > 0).sum(axis=1)
+    faculty_rows = [{
+        'faculty': name,
+        'hours': float(hours[i]),
+        'teaching_days': int(teaching_days[i]),
+        'busiest_day_hours': float(daily[i].max()) if daily.shape[1] else 0.0,
+        'hours_by_day': dict(zip(grid.days, daily[i].tolist())),
+    } for i, name in enumerate(faculty)]
+    mean = float(hours.mean()) if len(hours) else 0.0
+    balance = {
+        'mean_hours': mean,
+        'std_hours': float(hours.std()) if len(hours) else 0.0,
+        'min_hours': float(hours.min()) if len(hours) else 0.0,
+        'max_hours': float(hours.max()) if len(hours) else 0.0,
+        'coefficient_of_variation': float(hours.std() / mean) if mean else 0.0,
+        'max_to_mean': float(hours.max() / mean) if mean else 0.0,
+    }
+
+    # slot groups: code prefix before '(' as in the scheduler
+    groups, group_index = np.unique([code.split('(')[0].strip() for code in slot_codes], return_inverse=True)
+    offered = np.bincount(group_index, minlength=len(groups))
+    filled = np.bincount(group_index, weights=used.astype(float), minlength=len(groups))
+    group_rows = [{'group': str(name), 'slots': int(offered[i]), 'used': int(filled[i]),
+                   'fill_rate': round(float(filled[i] / offered[i]), 3) if offered[i] else None}
+                  for i, name in enumerate(groups)]
+
+    return {
+        'grid': {'days': list(grid.days), 'cells': grid.labels, 'hours_per_cell': hours_per_cell},
+        'utilization': {
+            'overall': round(float(used.mean()), 3) if len(used) else None,
+            'by_cell': _rounded(utilization),          # [day][cell] share of offered slots in use
+            'busy_batches': batch_busy.sum(axis=0).tolist(),  # [day][cell] batches in class
+        },
+        'batches': batch_rows,
+        'faculty': faculty_rows,
+        'faculty_balance': balance,
+        'slot_groups': group_rows,
+    }
+
+
+def write_analytics_sheets(writer, report):
+    """Add the analytics as sheets to an open pd.ExcelWriter"""
+    days, cells = report['grid']['days'], report['grid']['cells']
+    pd.DataFrame(report['utilization']['by_cell'], index=days, columns=cells).to_excel(
+        writer, sheet_name='Slot Utilization')
+    pd.DataFrame([{k: v for k, v in row.items() if k != 'idle_gap_hours_by_day'} for row in report['batches']]
+                 ).to_excel(writer, sheet_name='Batch Gaps', index=False)
+    pd.DataFrame([{k: v for k, v in row.items() if k != 'hours_by_day'} for row in report['faculty']]
+                 ).to_excel(writer, sheet_name='Faculty Load', index=False)
+    pd.DataFrame(report['slot_groups']).to_excel(writer, sheet_name='Slot Groups', index=False)
@@ -0,0 +1,149 @@
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from flask import Blueprint, jsonify, request
+
+from conflicts import find_conflicts
+from pipeline import SLOT_MASTER_PATH, load_slot_master, load_time_grid, schedule_courses
+from session_record import schedule_from_dicts, schedule_to_dicts
+import metrics
+
+# JSON endpoints for automation; same pipeline as the HTML upload form
+api = Blueprint('api', __name__, url_prefix='/api')
+
+MAX_BATCH_WORKERS = int(os.environ.get('TIMETABLE_BATCH_WORKERS', os.cpu_count() or 2))
+_pool = None
+
+
+def _get_pool():
+    """Process pool for bulk requests, created on first use and shut down when the server exits"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MAX_BATCH_WORKERS)
+        atexit.register(_pool.shutdown, cancel_futures=True)
+    return _pool
+
+
+def _optimize_seconds(value):
+    """The optional "optimize" budget as seconds; None if it is not a number"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_result(source, slot_master_path=SLOT_MASTER_PATH, optimize_seconds=0, previous=None):
+    """Schedule one input (raw workbook bytes or a list of row dicts) and return the JSON result.
+
+    previous is an earlier timetable to warm-start from: export bytes or a list of session dicts.
+    """
+    from data_loader import load_courses_from_minimal_format, load_courses_from_records, load_previous_schedule
+
+    with metrics.PHASE_LATENCY.time(phase='load'):
+        if isinstance(source, (bytes, bytearray)):
+            courses = load_courses_from_minimal_format(BytesIO(source))
+        elif isinstance(source, dict):
+            courses = load_courses_from_records(source.get('courses'), source.get('faculty'))
+        else:
+            courses = load_courses_from_records(source)
+        if isinstance(previous, (bytes, bytearray)):
+            previous = load_previous_schedule(BytesIO(previous))
+    schedule, stats = schedule_courses(courses, slot_master_path, optimize_seconds=optimize_seconds,
+                                       previous=previous)
+    return {
+        'schedule': schedule_to_dicts(schedule),
+        'stats': stats,
+        'conflicts': find_conflicts(schedule)
+    }
+
+
+def _safe_build_result(name, source, slot_master_path, optimize_seconds=0):
+    """build_result for worker processes: errors come back as data instead of killing the batch"""
+    try:
+        return name, build_result(source, slot_master_path, optimize_seconds)
+    except Exception as e:
+        return name, {'error': str(e)}
+
+
+@api.route('/schedule', methods=['POST'])
+def schedule():
+    """Schedule one course list; accepts JSON {"courses": [...], "faculty": [...]} or an uploaded 'file'.
+
+    "faculty" rows are optional: {"Name", "UnavailableSlots", "MaxHours"}.
+    "previous" (or an uploaded 'previous' export) warm-starts from an earlier timetable:
+    [{"course_code", "day", "time", "faculty", "batch", "duration"}, ...].
+    An optional "optimize" (seconds) runs the local-search post-pass.
+    """
+    payload = None if 'file' in request.files else request.get_json(silent=True) or {}
+    optimize_seconds = _optimize_seconds(request.form.get('optimize') if payload is None else payload.get('optimize'))
+    if optimize_seconds is None:
+        return jsonify({'error': "optimize must be a number of seconds."}), 400
+    try:
+        if payload is None:
+            previous = request.files['previous'].read() if 'previous' in request.files else None
+            result = build_result(request.files['file'].read(), optimize_seconds=optimize_seconds, previous=previous)
+        else:
+            source = {'courses': payload.get('courses'), 'faculty': payload.get('faculty')}
+            result = build_result(source, optimize_seconds=optimize_seconds, previous=payload.get('previous'))
+    except (KeyError, ValueError) as e:
+        metrics.ERRORS.inc(endpoint='api_schedule')
+        return jsonify({'error': f"Invalid course data: {str(e)}"}), 400
+    except Exception as e:
+        metrics.ERRORS.inc(endpoint='api_schedule')
+        return jsonify({'error': str(e)}), 500
+    return jsonify(result)
+
+
+@api.route('/batch', methods=['POST'])
+def batch():
+    """Schedule many inputs in parallel.
+
+    Accepts several uploaded 'files' or JSON {"inputs": {"name": [rows] or {"courses", "faculty"}, ...}}.
+    Each input is scheduled independently; failures are reported per input.
+    """
+    if request.files:
+        inputs = {f.filename or f'file{i}': f.read()
+                  for i, f in enumerate(request.files.getlist('files'))}
+        optimize_seconds = _optimize_seconds(request.form.get('optimize'))
+    else:
+        payload = request.get_json(silent=True) or {}
+        inputs = payload.get('inputs') or {}
+        optimize_seconds = _optimize_seconds(payload.get('optimize'))
+    if optimize_seconds is None:
+        return jsonify({'error': "optimize must be a number of seconds."}), 400
+    if not inputs:
+        return jsonify({'error': "No inputs given."}), 400
+
+    futures = [_get_pool().submit(_safe_build_result, name, source, SLOT_MASTER_PATH, optimize_seconds)
+               for name, source in inputs.items()]
+    results = dict(future.result() for future in futures)
+    failed = sum(1 for result in results.values() if 'error' in result)
+    if failed:
+        metrics.ERRORS.inc(failed, endpoint='api_batch')
+    return jsonify({'results': results})
+
+
+@api.route('/conflicts', methods=['POST'])
+def conflicts():
+    """Check an (edited) schedule for clashes; accepts JSON {"schedule": {code: [sessions]}}"""
+    payload = request.get_json(silent=True) or {}
+    try:
+        schedule = schedule_from_dicts(payload.get('schedule') or {})
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f"Invalid schedule: {str(e)}"}), 400
+    found = find_conflicts(schedule)
+    return jsonify({'conflicts': found, 'count': len(found)})
+
+
+@api.route('/analytics', methods=['POST'])
+def analytics():
+    """Utilization figures for a schedule; accepts JSON {"schedule": {code: [sessions]}}"""
+    payload = request.get_json(silent=True) or {}
+    try:
+        schedule = schedule_from_dicts(payload.get('schedule') or {})
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f"Invalid schedule: {str(e)}"}), 400
+    from analytics import analyze
+    return jsonify(analyze(schedule, load_slot_master(SLOT_MASTER_PATH), load_time_grid(SLOT_MASTER_PATH)))
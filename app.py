@@ -1,22 +1,100 @@
-from flask import Flask, render_template, request, send_file, session 
-import pandas as pd # to read and write excel files
+from flask import Flask, render_template, request, send_file, session, jsonify, Response, g
 from io import BytesIO # handles files in memory no need to save them to disk
 from pathlib import Path 
 import uuid # generate unique id used to track session
 import json # jason converts data to and from a format that can be stored in the session
 import os 
+import time
+import threading
 # flask create webapp, request handles data from users,send_files: semd files to users
 # for us excel file, session: stoers data for a user across requests
 
-from data_loader import load_courses_from_minimal_format as load_courses
-from scheduler import TimetableScheduler
-from visualizer import generate_html, generate_excel_bytes, generate_html_per_batch
+# pandas, the scheduler, visualizer and analytics load on first use (or in warmup()), not at import
+from session_record import pack_schedule, load_stored_schedule, schedule_from_dicts
+from pipeline import run_generate, run_alternatives, load_time_grid, load_slot_master
+from jobs import JobQueue
+from api import api
+from conflicts import find_conflicts
+from history import HistoryStore, VersionConflict, describe_delta, parse_delta
+import metrics
+from profiling import ProfileRun, profile_path
 
 app = Flask(__name__)  #start the flask app
 app.secret_key = os.urandom(24)
+app.register_blueprint(api) # JSON endpoints under /api
+# admin switch: only when set can a request ask for ?profile=1 on /generate
+app.config['PROFILING_ENABLED'] = os.environ.get('TIMETABLE_PROFILING') == '1'
+# profiles/ keeps the newest runs only, each for at most a week
+PROFILE_KEEP = int(os.environ.get('TIMETABLE_PROFILE_KEEP', 50))
+PROFILE_TTL = int(os.environ.get('TIMETABLE_PROFILE_TTL', 7 * 24 * 3600))
 
 BASE_DIR = Path(__file__).resolve().parent #folder where app is running
 SLOT_MASTER_PATH = BASE_DIR / 'data' / 'slot_master.xlsx' # slot master path
+OPTIMIZE_SECONDS = float(os.environ.get('TIMETABLE_OPTIMIZE_SECONDS', 2)) # budget for the quality post-pass
+# 'server' renders every batch table as HTML; 'client' sends a compact JSON schedule for static/timetable.js
+PREVIEW_MODE = os.environ.get('TIMETABLE_PREVIEW', 'server')
+# changes whenever the script does, so browsers may cache it for good
+SCRIPT_VERSION = str(int((BASE_DIR / 'static' / 'timetable.js').stat().st_mtime))
+
+# background generation: local worker pool; finished jobs stay in memory for an hour (JobQueue ttl), fetched or not
+jobs = JobQueue(max_workers=int(os.environ.get('TIMETABLE_WORKERS', 4)))
+
+# alternative timetables waiting for the user to pick one; dropped once chosen or after an hour
+MAX_ALTERNATIVES = 8
+ALTERNATIVES_TTL = 3600
+alternative_sets = {}
+alternative_lock = threading.Lock()
+
+# edit history per timetable: each /adjust appends a small delta to a log file every worker reads;
+# the cookie keeps the generated version and the version number this browser last saw
+histories = HistoryStore(os.environ.get('TIMETABLE_HISTORY_DIR', BASE_DIR / 'histories'),
+                         ttl=int(os.environ.get('TIMETABLE_HISTORY_TTL', 6 * 3600)))
+
+# endpoints whose latency is exported on /metrics
+TIMED_ENDPOINTS = {'generate', 'adjust', 'download_excel'}
+
+@app.before_request
+def start_timer():
+    if request.endpoint in TIMED_ENDPOINTS:
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=request.endpoint)
+        if response.status_code >= 500:
+            metrics.ERRORS.inc(endpoint=request.endpoint)
+    return response
+
+@app.after_request
+def cache_versioned_static(response):
+    if request.endpoint == 'static' and request.args.get('v'):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 365 * 24 * 3600
+    return response
+
+def client_preview():
+    """True when this request wants the browser-rendered preview"""
+    return (request.values.get('preview') or PREVIEW_MODE) == 'client'
+
+def wants_json():
+    return request.values.get('format') == 'json'
+
+def render_preview(schedule, batch_htmls, session_id, profile_id=None):
+    """Batch-wise preview page; without batch_htmls the browser draws it from the compact payload"""
+    from visualizer import schedule_payload
+    if batch_htmls is None:
+        payload = schedule_payload(schedule, load_time_grid(SLOT_MASTER_PATH))
+        return render_template('client_preview.html', payload=payload, session_id=session_id,
+                               profile_id=profile_id, script_version=SCRIPT_VERSION)
+    return render_template('multi_preview.html', batch_htmls=batch_htmls, session_id=session_id,
+                           profile_id=profile_id)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render_all(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')  # routes shows pages
 def index():
@@ -25,19 +103,30 @@ def index():
 @app.route('/download_template')
 def download_template():
     sample_data = {
-        'Subject Number': ['AE21202/AE21002', 'AE29202/AE29002'],
-        'Subject Name': ['Low Speed Aerodynamics', 'Aerodynamics Lab I'],
-        'L-T-P': ['3-1-0', '0-0-3'],
-        'Teacher(s)': ['SG', 'MK+SMD'],
-        'Type': ['Core', 'Lab'],
-        'Batch': ['2nd', '2nd'],
-        'Room': ['', 'Aero-lab']
+        'Subject Number': ['AE21202/AE21002', 'AE29202/AE29002', 'AE40011', 'AE40013'],
+        'Subject Name': ['Low Speed Aerodynamics', 'Aerodynamics Lab I', 'Rotorcraft Dynamics', 'Hypersonic Flow'],
+        'L-T-P': ['3-1-0', '0-0-3', '3-0-0', '3-0-0'],
+        'Teacher(s)': ['SG', 'MK+SMD', 'DP', 'KR'],
+        'Type': ['Core', 'Lab', 'Elective', 'Elective'],
+        'Batch': ['2nd', '2nd', '4th', '4th'],
+        'Room': ['', 'Aero-lab', 'NC231', 'NC232'],
+        # electives in the same basket are taught at the same time; students pick one
+        'Basket': ['', '', 'DE1', 'DE1']
     }
     
+    # optional faculty constraints: slot codes/groups, days or 'Day HH:MM-HH:MM' separated by ';'
+    faculty_data = {
+        'Name': ['SG', 'MK'],
+        'UnavailableSlots': ['Friday', 'Monday 08:00-10:00; LAB SLOT:J'],
+        'MaxHours': [12, '']
+    }
+
+    import pandas as pd # to write the excel file
     output = BytesIO() # creates in memory file
     df = pd.DataFrame(sample_data) #Converts the dictionary sample_data into a pandas DataFrame (df).
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False, sheet_name='Sheet1')
+        pd.DataFrame(faculty_data).to_excel(writer, index=False, sheet_name='Faculty')
     output.seek(0) # moves the cursor to the start 
 
     return send_file(output,
@@ -50,25 +139,52 @@ def generate():
     if 'file' not in request.files or request.files['file'].filename == '':
         return render_template('error.html', errors=["Please upload a valid Excel file."]) # check if file uploaded or not
 
-    try:
-        file = request.files['file']  #get file
-        file_bytes = BytesIO(file.read()) # reads the file in memory
-        courses = load_courses(file_bytes) # calling function load_courses to process the uploaded file and extract the data
+    file = request.files['file']  #get file
+    file_bytes = BytesIO(file.read()) # reads the file in memory
+    previous = request.files.get('previous') # optional earlier export to warm-start from
+    previous_bytes = BytesIO(previous.read()) if previous and previous.filename else None
+    optimize_seconds = OPTIMIZE_SECONDS if request.form.get('optimize') else 0 # optional local-search pass
 
-        if not SLOT_MASTER_PATH.exists():
-            return render_template('error.html', errors=["Slot master file not found."]) # slots file check if it is there or not
+    if not SLOT_MASTER_PATH.exists():
+        return render_template('error.html', errors=["Slot master file not found."]) # checked before any work is queued
 
-        slot_master = pd.read_excel(SLOT_MASTER_PATH, sheet_name='Slots') #reading slots sheet data
-        scheduler = TimetableScheduler(courses, slot_master)  # creates object name scheduler giving it the courses and available slots 
-        schedule = scheduler.generate_schedule()     # generate the timetable (core logic for arranging courses into slots)
+    alternatives = min(request.form.get('alternatives', 1, type=int), MAX_ALTERNATIVES) # how many options to compare
+    if alternatives > 1:
+        if request.form.get('mode') == 'background':
+            return render_template('error.html', errors=["Alternatives cannot run in the background; "
+                                                         "untick one of the two options."]), 400
+        return generate_alternatives_page(file_bytes, alternatives, optimize_seconds, previous_bytes)
 
-        session_id = str(uuid.uuid4())
-        session[session_id] = json.dumps(schedule)
+    if request.form.get('mode') == 'background':
+        # queue the work and answer straight away with a job id
+        job_id = jobs.submit(run_generate, file_bytes, SLOT_MASTER_PATH, optimize_seconds=optimize_seconds,
+                             previous_stream=previous_bytes, render_html=not client_preview())
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'job_id': job_id, 'status_url': f'/jobs/{job_id}'}), 202
+        return render_template('job_status.html', job_id=job_id), 202
 
-        # Generate per-batch HTML
-        batch_htmls = generate_html_per_batch(schedule)
+    try:
+        # load courses, generate the timetable (core logic) and render per-batch HTML
+        profile_id = None
+        if app.config['PROFILING_ENABLED'] and '1' in (request.args.get('profile'), request.form.get('profile')):
+            with ProfileRun(keep=PROFILE_KEEP, ttl=PROFILE_TTL) as profiler:
+                schedule, batch_htmls = run_generate(file_bytes, SLOT_MASTER_PATH, profiler=profiler,
+                                                     optimize_seconds=optimize_seconds,
+                                                     previous_stream=previous_bytes,
+                                                     render_html=not client_preview())
+            profile_id = profiler.id
+        else:
+            schedule, batch_htmls = run_generate(file_bytes, SLOT_MASTER_PATH, optimize_seconds=optimize_seconds,
+                                                 previous_stream=previous_bytes, render_html=not client_preview())
 
-        return render_template('multi_preview.html', batch_htmls=batch_htmls, session_id=session_id)
+        session_id = str(uuid.uuid4())
+        session[session_id] = pack_schedule(schedule) # compact binary form keeps the cookie small
+
+        response = app.make_response(render_preview(schedule, batch_htmls, session_id, profile_id))
+        response.headers['X-Session-Id'] = session_id # lets scripts follow up with /adjust and /download
+        if profile_id:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
 
     # except Exception as e:
     #     return render_template('error.html', errors=[f"Error generating timetable: {str(e)}"]) #If anything goes wrong in the try block (bad file, scheduling error, etc.), it shows an error page with the error message.
@@ -76,45 +192,314 @@ def generate():
     #change here
     except Exception as e:
         import traceback
+        metrics.ERRORS.inc(endpoint='generate') # error page is rendered with 200, count it here
         error_detail = f"Error: {str(e)}\n\n{traceback.format_exc()}"
         return render_template('error.html', errors=[error_detail])
 
 
+def generate_alternatives_page(file_bytes, k, optimize_seconds, previous_bytes=None):
+    try:
+        options = run_alternatives(file_bytes, SLOT_MASTER_PATH, k=k, optimize_seconds=optimize_seconds,
+                                   previous_stream=previous_bytes)
+    except Exception as e:
+        metrics.ERRORS.inc(endpoint='generate')
+        return render_template('error.html', errors=[f"Error generating alternatives: {str(e)}"])
+
+    set_id = str(uuid.uuid4())
+    now = time.time()
+    with alternative_lock:
+        for old_id in [i for i, (created, _) in alternative_sets.items() if created < now - ALTERNATIVES_TTL]:
+            del alternative_sets[old_id]
+        # only the packed schedules stay on the server until one is chosen
+        alternative_sets[set_id] = (now, [pack_schedule(o['schedule']) for o in options])
+    return render_template('alternatives.html', set_id=set_id, options=options)
+
+
+@app.route('/alternatives/<set_id>/<int:index>', methods=['POST'])
+def choose_alternative(set_id, index):
+    with alternative_lock:
+        entry = alternative_sets.get(set_id)
+        if entry is None or not 0 <= index < len(entry[1]):
+            return render_template('error.html', errors=["Alternatives expired or invalid."])
+        del alternative_sets[set_id]
+    packed = entry[1][index]
+    from visualizer import generate_html_per_batch
+
+    session_id = str(uuid.uuid4())
+    session[session_id] = packed
+    schedule = load_stored_schedule(packed)
+    batch_htmls = None if client_preview() else generate_html_per_batch(schedule, load_time_grid(SLOT_MASTER_PATH))
+    return render_preview(schedule, batch_htmls, session_id)
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job.'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    # server-sent events: one message per progress change until the job finishes
+    def stream():
+        version = None
+        while True:
+            job = jobs.get(job_id) if version is None else jobs.wait(job_id, version)
+            if job is None:
+                yield 'event: error\ndata: {"error": "Unknown or expired job."}\n\n'
+                return
+            if job.version == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = job.version
+            yield f"data: {json.dumps(job.to_dict())}\n\n"
+            if job.status in ('done', 'failed'):
+                return
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return render_template('error.html', errors=["Job not found or expired."])
+    if job.status == 'failed':
+        return render_template('error.html', errors=[job.error])
+    if job.status != 'done':
+        return render_template('job_status.html', job_id=job_id)
+
+    schedule, batch_htmls = job.result # batch_htmls is None when the job was queued for a client preview
+    session_id = str(uuid.uuid4())
+    session[session_id] = pack_schedule(schedule) # compact binary form keeps the cookie small
+    return render_preview(schedule, batch_htmls, session_id)
+
+
+@app.route('/profiles/<profile_id>')
+def profile_summary(profile_id):
+    path = profile_path(profile_id, 'summary.json') if app.config['PROFILING_ENABLED'] else None
+    if path is None:
+        return jsonify({'error': 'Profile not found.'}), 404
+    summary = json.loads(path.read_text())
+    summary['files'] = {name: f'/profiles/{profile_id}/{name}'
+                        for name in sorted(p.name for p in path.parent.iterdir())}
+    return jsonify(summary)
+
+
+@app.route('/profiles/<profile_id>/<filename>')
+def profile_file(profile_id, filename):
+    path = profile_path(profile_id, filename) if app.config['PROFILING_ENABLED'] else None
+    if path is None:
+        return jsonify({'error': 'Profile file not found.'}), 404
+    return send_file(path, as_attachment=True, download_name=f'{profile_id}-{filename}')
+
+
+def cookie_version(session_id):
+    """Version of a timetable this browser last saw; 0 until it is edited"""
+    return session.get(f'{session_id}:version', 0)
+
+
+def stored_schedule(session_id):
+    """Current version of a timetable; None if unknown, or if its edit history has expired"""
+    history = histories.get(session_id)
+    if history is not None:
+        with history.lock:
+            return history.current()
+    stored = session.get(session_id)
+    if not stored or cookie_version(session_id):
+        return None # the edits lived in the expired history; the generated version would silently drop them
+    return load_stored_schedule(stored) # packed bytes back to session records
+
+
+def schedule_history(session_id):
+    """Edit history of a timetable, started from the generated version in the cookie on first use; None if unknown"""
+    history = histories.get(session_id)
+    if history is None and session.get(session_id) and not cookie_version(session_id):
+        history = histories.start(session_id, load_stored_schedule(session[session_id]))
+    return history
+
+
+def edit_error(message, status):
+    if wants_json():
+        return jsonify({'error': message}), status
+    return f"<div class='error'>{message}</div>", status
+
+
+def missing_history(session_id):
+    if cookie_version(session_id):
+        return edit_error("The edit history of this timetable has expired; generate it again.", 410)
+    return edit_error("Session expired or invalid.", 404)
+
+
+def version_conflict(session_id, error):
+    """409 for an edit made on an older version; JSON clients also get the current version to redraw"""
+    history = histories.get(session_id)
+    if history is None or not wants_json():
+        return edit_error(str(error), 409)
+    from visualizer import schedule_payload
+    with history.lock:
+        payload = schedule_payload(history.current(), load_time_grid(SLOT_MASTER_PATH))
+    return jsonify({'error': str(error), 'version': error.version, 'payload': payload}), 409
+
+
 @app.route('/download/<session_id>')
 def download_excel(session_id):
     try:
-        schedule_json = session.get(session_id)
-        if not schedule_json:
+        schedule = stored_schedule(session_id)
+        if schedule is None:
             return render_template('error.html', errors=["Session expired or invalid."])
 
-        schedule = json.loads(schedule_json) # json to python object
-        output = BytesIO(generate_excel_bytes(schedule))
+        from analytics import analyze
+        from visualizer import generate_excel_bytes
+        grid = load_time_grid(SLOT_MASTER_PATH)
+        report = analyze(schedule, load_slot_master(SLOT_MASTER_PATH), grid) # utilization sheets
+        output = BytesIO(generate_excel_bytes(schedule, grid, report))
 
         return send_file(output,
                          mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                          as_attachment=True,
                          download_name='timetable.xlsx') # sending downloadable excel file
     except Exception as e:
+        metrics.ERRORS.inc(endpoint='download_excel')
         return render_template('error.html', errors=[f"Error downloading timetable: {str(e)}"])
 
 
-# dynamically adjustment of timetable
+# clash report for a stored (possibly hand-edited) timetable
+@app.route('/conflicts/<session_id>')
+def conflicts(session_id):
+    schedule = stored_schedule(session_id)
+    if schedule is None:
+        return jsonify({'error': 'Session expired or invalid.'}), 404
+    found = find_conflicts(schedule)
+    return jsonify({'conflicts': found, 'count': len(found)})
+
+
+# workload / utilization figures for a stored timetable
+@app.route('/analytics/<session_id>')
+def analytics(session_id):
+    schedule = stored_schedule(session_id)
+    if schedule is None:
+        return jsonify({'error': 'Session expired or invalid.'}), 404
+    from analytics import analyze
+    return jsonify(analyze(schedule, load_slot_master(SLOT_MASTER_PATH), load_time_grid(SLOT_MASTER_PATH)))
+
+
+# dynamically adjustment of timetable: post the edited schedule, or only its changes as delta (the
+# /history/<session_id>/diff format), with the version they were made on
 @app.route('/adjust', methods=['POST'])
 def adjust():
     try:
         session_id = request.form.get('session_id') #session id fetteched from data
-        updated_schedule = json.loads(request.form.get('schedule', '{}'))
-
         if not session_id:
             return "Missing session ID", 400
+        expected = request.form.get('version', cookie_version(session_id), type=int)
+        if 'delta' in request.form:
+            delta, updated_schedule = parse_delta(json.loads(request.form['delta'])), None
+        else:
+            delta, updated_schedule = None, schedule_from_dicts(json.loads(request.form.get('schedule', '{}')))
 
-        session[session_id] = json.dumps(updated_schedule)
-        html = generate_html(updated_schedule)
-        return html
+        history = schedule_history(session_id)
+        if history is None and (updated_schedule is None or cookie_version(session_id)):
+            return missing_history(session_id)
+        if history is None:
+            # unknown timetable: the edited one becomes its first version
+            history = histories.start(session_id, updated_schedule)
+            session[session_id] = pack_schedule(updated_schedule)
+            version = 0
+        else:
+            try:
+                history, version = histories.commit(session_id, updated_schedule, delta, expected) # appends the delta only
+            except VersionConflict as e:
+                return version_conflict(session_id, e)
+            except KeyError:
+                return missing_history(session_id)
+            except ValueError as e: # the delta does not fit the current version
+                return edit_error(str(e), 400)
+        session[f'{session_id}:version'] = version
+        with history.lock:
+            schedule = history.current()
+        return adjusted_view(schedule, version)
 
     except Exception as e:
+        if wants_json():
+            return jsonify({'error': f"Adjustment error: {str(e)}"}), 500
         return f"<div class='error'>Adjustment error: {str(e)}</div>", 500
 
+
+def adjusted_view(schedule, version):
+    """The edited timetable as HTML, or with format=json as the compact payload static/timetable.js draws"""
+    from visualizer import generate_html, schedule_payload
+    grid = load_time_grid(SLOT_MASTER_PATH)
+    if wants_json():
+        response = jsonify({'version': version, 'payload': schedule_payload(schedule, grid)})
+    else:
+        response = app.make_response(generate_html(schedule, grid)) # clashes are listed at the top of the returned view
+    response.headers['X-Version'] = str(version)
+    return response
+
+
+# undo / redo step through the edit history and return the view like /adjust does
+@app.route('/history/<session_id>/<action>', methods=['POST'])
+def history_step(session_id, action):
+    if action not in ('undo', 'redo'):
+        return "Unknown history action", 404
+    if schedule_history(session_id) is None:
+        return missing_history(session_id)
+    try:
+        history, version = histories.step(session_id, action,
+                                          request.form.get('version', cookie_version(session_id), type=int))
+    except VersionConflict as e:
+        return version_conflict(session_id, e)
+    except KeyError:
+        return missing_history(session_id)
+    except ValueError as e: # nothing to undo / redo
+        return edit_error(str(e), 409)
+    session[f'{session_id}:version'] = version
+    with history.lock:
+        schedule = history.current()
+    return adjusted_view(schedule, version)
+
+
+@app.route('/history/<session_id>')
+def history_log(session_id):
+    history = schedule_history(session_id)
+    if history is None:
+        return jsonify({'error': 'Session expired or invalid.'}), 404
+    with history.lock:
+        return jsonify({'version': history.version, 'can_undo': history.can_undo(),
+                        'can_redo': history.can_redo(), 'versions': history.log()})
+
+
+# what changed between two versions: ?from=<version>&to=<version>, default the oldest kept one to the current one
+@app.route('/history/<session_id>/diff')
+def history_diff(session_id):
+    history = schedule_history(session_id)
+    if history is None:
+        return jsonify({'error': 'Session expired or invalid.'}), 404
+    with history.lock:
+        start = request.args.get('from', history.base_version, type=int)
+        end = request.args.get('to', history.version, type=int)
+        try:
+            delta = history.diff(start, end)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify(dict(describe_delta(delta), **{'from': start, 'to': end}))
+
+def warmup():
+    """Pay the first-request costs up front: heavy imports, slot master and grid, compiled templates"""
+    import pipeline
+    import scheduler, decompose, optimizer, alternatives, data_loader, visualizer, analytics  # noqa: F401
+    pipeline.load_time_grid(SLOT_MASTER_PATH) # also caches the slot master frame
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+# TIMETABLE_WARMUP=1 warms up at import, so pre-fork servers (gunicorn --preload) share it across workers
+if os.environ.get('TIMETABLE_WARMUP') == '1':
+    warmup()
+
 if __name__ == '__main__': #starts the flask webserver when run scripts directly
     app.run(debug=True)  #debug=True helps you see errors and automatically reloads the app when you make code changes
 
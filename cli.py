@@ -0,0 +1,196 @@
+"""Headless timetable generation for a directory of course workbooks.
+
+    python cli.py data/departments -o out/ -j 4
+
+Every *.xlsx in the input directory is scheduled in a worker process and
+written as <name>.xlsx (export with utilization sheets), <name>.html (per-batch
+preview) and <name>.analytics.json.
+Inputs whose content hash (and slot master) is unchanged since the last
+run are skipped unless --force is given. With --warm-start a changed input
+keeps the courses that are unchanged since its previous <name>.xlsx export.
+--decompose N solves the independent course components of each large
+workbook in N extra processes (see decompose.py).
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader
+
+from data_loader import load_courses_from_minimal_format as load_courses, load_previous_schedule
+from analytics import analyze
+from pipeline import BASE_DIR, SLOT_MASTER_PATH, load_slot_master, load_time_grid, phase, schedule_courses
+from profiling import ProfileRun
+from visualizer import generate_excel_bytes, generate_html_per_batch
+
+MANIFEST_NAME = '.timetable_manifest.json'
+
+
+def file_hash(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def find_workbooks(input_dir):
+    """Course workbooks in input_dir, skipping Excel lock files (~$...)"""
+    return sorted(p for p in Path(input_dir).glob('*.xlsx') if not p.name.startswith('~$'))
+
+
+def render_preview_page(batch_htmls):
+    """Render the same batch-wise page the web app shows"""
+    env = Environment(loader=FileSystemLoader(str(BASE_DIR / 'templates')), autoescape=True)
+    return env.get_template('multi_preview.html').render(batch_htmls=batch_htmls, session_id='')
+
+
+def process_workbook(path, output_dir, slot_master_path, profile=False, optimize_seconds=0, warm_start=False,
+                     decompose=0):
+    """Run the full pipeline on one workbook and write its outputs; returns a timing row"""
+    path = Path(path)
+    output_dir = Path(output_dir)
+    if profile:
+        profile_id = f"{path.stem.replace(' ', '_')}-{time.strftime('%Y%m%d-%H%M%S')}"
+        with ProfileRun(profile_id, output_dir / 'profiles') as profiler:
+            timings = _process_workbook(path, output_dir, slot_master_path, profiler, optimize_seconds, warm_start,
+                                        decompose)
+        timings['profile'] = str(profiler.directory)
+        return timings
+    return _process_workbook(path, output_dir, slot_master_path, optimize_seconds=optimize_seconds,
+                             warm_start=warm_start, decompose=decompose)
+
+
+def _process_workbook(path, output_dir, slot_master_path, profiler=None, optimize_seconds=0, warm_start=False,
+                      decompose=0):
+    timings = {'input': path.name}
+    previous_export = output_dir / f'{path.stem}.xlsx'
+
+    start = time.perf_counter()
+    with phase('load', profiler):
+        courses = load_courses(path)
+        previous = load_previous_schedule(previous_export) if warm_start and previous_export.exists() else None
+    timings['load_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    schedule, stats = schedule_courses(courses, slot_master_path, profiler, optimize_seconds, previous, decompose)
+    timings['schedule_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    grid = load_time_grid(slot_master_path)
+    with phase('render', profiler):
+        report = analyze(schedule, load_slot_master(slot_master_path), grid)
+        (output_dir / f'{path.stem}.xlsx').write_bytes(generate_excel_bytes(schedule, grid, report))
+        (output_dir / f'{path.stem}.analytics.json').write_text(json.dumps(report, indent=1))
+        (output_dir / f'{path.stem}.html').write_text(
+            render_preview_page(generate_html_per_batch(schedule, grid)), encoding='utf-8')
+    timings['export_s'] = time.perf_counter() - start
+
+    timings['courses'] = stats['courses']
+    timings['sessions'] = stats['sessions']
+    timings['unplaced_hours'] = stats['unplaced_hours']
+    timings['pinned_courses'] = stats['pinned_courses']
+    return timings
+
+
+def load_manifest(output_dir):
+    try:
+        return json.loads((Path(output_dir) / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    (Path(output_dir) / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+
+
+def run(input_dir, output_dir, slot_master_path=SLOT_MASTER_PATH, workers=None, force=False, profile=False,
+        optimize_seconds=0, warm_start=False, decompose=0):
+    """Generate every changed workbook in input_dir; returns the list of timing rows"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_manifest(output_dir)
+    slot_hash = file_hash(slot_master_path)
+
+    pending = {}
+    rows = []
+    for path in find_workbooks(input_dir):
+        # the slot master is part of the key: a new slot layout changes every timetable
+        key = hashlib.sha256((file_hash(path) + slot_hash + f'optimize={optimize_seconds},decompose={decompose}').encode()).hexdigest()
+        outputs_exist = (output_dir / f'{path.stem}.xlsx').exists() and (output_dir / f'{path.stem}.html').exists()
+        if not force and not profile and manifest.get(path.name) == key and outputs_exist:
+            rows.append({'input': path.name, 'status': 'unchanged'})
+        else:
+            pending[path] = key
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_workbook, path, output_dir, slot_master_path, profile, optimize_seconds,
+                               warm_start, decompose): path
+                   for path in pending}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                row = future.result()
+                row['status'] = 'generated'
+                manifest[path.name] = pending[path]
+            except Exception as e:
+                row = {'input': path.name, 'status': f'failed: {e}'}
+                manifest.pop(path.name, None)
+            rows.append(row)
+
+    save_manifest(output_dir, manifest)
+    rows.sort(key=lambda r: r['input'])
+    return rows
+
+
+def write_summary(rows, output_dir):
+    """Write summary.csv next to the outputs"""
+    fields = ['input', 'status', 'courses', 'sessions', 'unplaced_hours', 'pinned_courses', 'load_s', 'schedule_s',
+              'export_s', 'profile']
+    with open(Path(output_dir) / 'summary.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: (f'{v:.3f}' if isinstance(v, float) else v) for k, v in row.items() if k in fields})
+
+
+def print_summary(rows, elapsed):
+    print(f"{'input':40} {'status':12} {'sessions':>8} {'unplaced':>8} {'load':>7} {'sched':>7} {'export':>7}")
+    for row in rows:
+        secs = [f"{row[k]:7.2f}" if k in row else ' ' * 7 for k in ('load_s', 'schedule_s', 'export_s')]
+        print(f"{row['input'][:40]:40} {row['status'][:12]:12} {row.get('sessions', ''):>8} "
+              f"{row.get('unplaced_hours', ''):>8} {' '.join(secs)}")
+    generated = sum(1 for r in rows if r['status'] == 'generated')
+    print(f"{generated} generated, {len(rows) - generated} skipped/failed in {elapsed:.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate timetables for every workbook in a directory")
+    parser.add_argument('input_dir', help="directory containing course workbooks (*.xlsx)")
+    parser.add_argument('-o', '--output-dir', default='timetables', help="where to write outputs (default: timetables)")
+    parser.add_argument('--slot-master', default=str(SLOT_MASTER_PATH), help="slot master workbook")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="parallel worker processes")
+    parser.add_argument('--force', action='store_true', help="regenerate even if inputs are unchanged")
+    parser.add_argument('--profile', action='store_true',
+                        help="save cProfile/tracemalloc data per workbook under <output-dir>/profiles (implies --force)")
+    parser.add_argument('--warm-start', action='store_true',
+                        help="keep unchanged courses where the previous export in the output dir put them")
+    parser.add_argument('--optimize', type=float, default=0, metavar='SECONDS',
+                        help="run the local-search quality pass for up to SECONDS per workbook")
+    parser.add_argument('--decompose', type=int, default=0, metavar='N',
+                        help="solve independent course components of large workbooks in N processes")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = run(args.input_dir, args.output_dir, args.slot_master, args.workers, args.force, args.profile,
+               args.optimize, args.warm_start, args.decompose)
+    write_summary(rows, args.output_dir)
+    print_summary(rows, time.perf_counter() - start)
+    return 1 if any(r['status'].startswith('failed') for r in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
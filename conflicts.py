@@ -0,0 +1,79 @@
+"""Clash detection for any schedule, including hand-edited ones.
+
+Sessions are sorted once per day and swept left to right. For every
+resource (faculty, batch, room) the sweep keeps a heap of the sessions still
+running; a session that starts before the earliest of them ends clashes with
+every one left in the heap. That is O(n log n) plus one step per clash
+reported, so it is cheap enough to run on every save.
+
+Courses of one elective basket share their batch's time on purpose, so a
+batch overlap between two courses of the same basket is not a clash.
+"""
+import heapq
+from collections import defaultdict
+
+from session_record import SessionRecord, parse_time_range
+
+RESOURCES = ('faculty', 'batch', 'room')
+
+
+def _interval(session):
+    if isinstance(session, SessionRecord):
+        return session.start, session.end
+    return parse_time_range(session['time'])
+
+
+def _summary(code, session):
+    return {
+        'course_code': code,
+        'type': session.get('type', ''),
+        'time': session['time'],
+        'faculty': session.get('faculty', ''),
+        'batch': session.get('batch', ''),
+    }
+
+
+def find_conflicts(schedule, resources=RESOURCES):
+    """Every pair of overlapping sessions that share a faculty, batch or room.
+
+    Returns a list of {'type', 'resource', 'day', 'start', 'end', 'sessions'}
+    sorted by day and time; start/end are the overlapping minutes.
+    """
+    by_day = defaultdict(list)
+    for code, sessions in schedule.items():
+        for session in sessions:
+            start, end = _interval(session)
+            by_day[session['day']].append((start, end, code, session))
+
+    conflicts = []
+    for day, entries in by_day.items():
+        entries.sort(key=lambda e: (e[0], e[1]))
+        running = defaultdict(list)  # (resource, value) -> heap of (end, index)
+        for index, (start, end, code, session) in enumerate(entries):
+            for field in resources:
+                value = session.get(field)
+                if not value:
+                    continue
+                heap = running[(field, value)]
+                while heap and heap[0][0] <= start:
+                    heapq.heappop(heap)
+                basket = session.get('basket')
+                for other_end, other in heap:
+                    other_start, _, other_code, other_session = entries[other]
+                    if field == 'batch' and basket and other_code != code and other_session.get('basket') == basket:
+                        continue
+                    conflicts.append({
+                        'type': field,
+                        'resource': value,
+                        'day': day,
+                        'start': start,
+                        'end': min(end, other_end),
+                        'sessions': [_summary(other_code, other_session), _summary(code, session)],
+                    })
+                heapq.heappush(heap, (end, index))
+    return conflicts
+
+
+def conflict_keys(conflicts):
+    """(course_code, day, time) of every session involved in a clash, for highlighting"""
+    return {(s['course_code'], c['day'], s['time']) for c in conflicts for s in c['sessions']}
@@ -39,8 +39,61 @@ def expand_teachers(teacher_str):
 
 
 def load_courses_from_minimal_format(file_stream):
-    df = pd.read_excel(file_stream)
-    
+    xls = pd.ExcelFile(file_stream)
+    df = xls.parse(xls.sheet_names[0])
+    # optional sheet with per-faculty constraints: Name, UnavailableSlots, MaxHours
+    faculty_df = xls.parse('Faculty') if 'Faculty' in xls.sheet_names else None
+    return normalize_courses(df, faculty_df)
+
+def load_courses_from_records(records, faculty=None):
+    """Build the course table from a list of row dicts using the template column names"""
+    if not isinstance(records, list) or not records:
+        raise ValueError("courses must be a non-empty list of rows")
+    return normalize_courses(pd.DataFrame(records), pd.DataFrame(faculty) if faculty else None)
+
+def load_previous_schedule(file):
+    """Read a timetable exported by generate_excel_bytes (its 'Schedule' sheet) for warm starts.
+
+    Returns a list of session dicts: course_code, day, time, faculty, batch, duration.
+    """
+    xls = pd.ExcelFile(file)
+    sheet = 'Schedule' if 'Schedule' in xls.sheet_names else xls.sheet_names[0]
+    df = xls.parse(sheet)
+    missing = {'Course Code', 'Day', 'Time', 'Faculty'} - set(df.columns)
+    if missing:
+        raise ValueError(f"Previous timetable is missing columns: {', '.join(sorted(missing))}")
+    df = df.dropna(subset=['Course Code', 'Day', 'Time'])
+    if 'Batch' not in df.columns:
+        df['Batch'] = ''
+    if 'Duration (hrs)' not in df.columns:
+        df['Duration (hrs)'] = float('nan')
+    return [{
+        'course_code': str(row['Course Code']).strip(),
+        'day': str(row['Day']).strip(),
+        'time': str(row['Time']).strip(),
+        'faculty': str(row['Faculty']).strip(),
+        'batch': '' if pd.isna(row['Batch']) else str(row['Batch']).strip(),
+        'duration': None if pd.isna(row['Duration (hrs)']) else int(row['Duration (hrs)']),
+    } for _, row in df.iterrows()]
+
+def merge_faculty_constraints(df, faculty_df):
+    """Copy UnavailableSlots / MaxHours from the Faculty sheet onto each course row of that faculty"""
+    faculty_df = faculty_df.rename(columns={'Faculty': 'Name', 'Teacher': 'Name'})
+    if 'Name' not in faculty_df.columns:
+        return df
+    faculty_df = faculty_df.dropna(subset=['Name'])
+    names = faculty_df['Name'].astype(str).str.strip()
+    if 'UnavailableSlots' in faculty_df.columns:
+        unavailable = dict(zip(names, faculty_df['UnavailableSlots'].fillna('').astype(str)))
+        extra = df['Faculty1'].map(unavailable).fillna('')
+        df['UnavailableSlots'] = (df['UnavailableSlots'] + ';' + extra).str.strip(';')
+    if 'MaxHours' in faculty_df.columns:
+        max_hours = dict(zip(names, pd.to_numeric(faculty_df['MaxHours'], errors='coerce')))
+        df['MaxHours'] = df['MaxHours'].fillna(df['Faculty1'].map(max_hours))
+    return df
+
+def normalize_courses(df, faculty_df=None):
+    """Map template columns to the scheduler's course table, one row per batch"""
     # Handle different column name variations
     column_map = {
         'Subject Number': 'SubjectCode',
@@ -48,7 +101,8 @@ def load_courses_from_minimal_format(file_stream):
         'L-T-P': 'L-T-P',
         'Teacher(s)': 'FacultyRaw',
         'Batch': 'BatchRaw',
-        'Room': 'RoomPref'
+        'Room': 'RoomPref',
+        'Type': 'Category'
     }
     
     # Rename columns to standard names
@@ -61,6 +115,20 @@ def load_courses_from_minimal_format(file_stream):
         df['BatchRaw'] = ''
     if 'RoomPref' not in df.columns:
         df['RoomPref'] = ''
+    if 'UnavailableSlots' not in df.columns:
+        df['UnavailableSlots'] = ''
+    if 'MaxHours' not in df.columns:
+        df['MaxHours'] = float('nan')
+    # Type as written in the sheet (Core, Elective, ...); the scheduler's Type is derived from L-T-P below
+    if 'Category' not in df.columns:
+        df['Category'] = ''
+    # optional elective basket: courses with the same Basket run in parallel for each batch
+    if 'Basket' not in df.columns:
+        df['Basket'] = ''
+    df['Category'] = df['Category'].fillna('').astype(str).str.strip()
+    df['Basket'] = df['Basket'].fillna('').astype(str).str.strip()
+    df['UnavailableSlots'] = df['UnavailableSlots'].fillna('').astype(str)
+    df['MaxHours'] = pd.to_numeric(df['MaxHours'], errors='coerce')
     
     # Standardize data formats
     # Handle L-T-P date formatting issue
@@ -69,6 +137,8 @@ def load_courses_from_minimal_format(file_stream):
     df['FacultyRaw'] = df['FacultyRaw'].astype(str).str.strip()
     df['FacultyList'] = df['FacultyRaw'].apply(expand_teachers)
     df['Faculty1'] = df['FacultyList'].apply(lambda x: x[0] if x else '')
+    if faculty_df is not None:
+        df = merge_faculty_constraints(df, faculty_df)
     
     # Process batches and expand rows
     df['BatchList'] = df['BatchRaw'].apply(infer_batch)
@@ -98,7 +168,8 @@ def load_courses_from_minimal_format(file_stream):
     
     # Return all relevant columns including AllBatches
     return expanded_df[['SubjectCode', 'SubjectName', 'L-T-P', 'Faculty1', 
-                       'BatchYear', 'AllBatches', 'Type', 'RoomPref']]
+                       'BatchYear', 'AllBatches', 'Type', 'RoomPref',
+                       'UnavailableSlots', 'MaxHours', 'Category', 'Basket']]
 def fix_ltp_string(ltp):
     """Ensure L-T-P string is in 'int-int-int' format."""
     try:
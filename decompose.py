@@ -0,0 +1,199 @@
+"""Split a scheduling run into independent parts and solve them in parallel.
+
+Two courses interact only through a shared faculty member or batch, so the
+connected components of the course-faculty-batch graph (union-find) can be
+scheduled separately. The slot master is the one resource they share: each
+component gets the whole slot groups its courses fit (partition_slots).
+Components run in worker processes on the shared time grid, and their
+sessions are merged in component order, so the result does not depend on
+which worker finishes first.
+
+A component's scheduler does not always take the groups it was given in the
+planned way, so a final sequential pass keeps every completely placed course
+and schedules the others whole against every slot left over. When the slot
+master cannot fit most of the demand at all, partitions would only starve
+and the final pass would redo the work, so such inputs run in one pass.
+"""
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from scheduler import TimetableScheduler
+from session_record import pack_schedule, time_to_minutes, unpack_schedule
+from timegrid import grid_for
+
+# below this many courses the merge and final pass (0.1-0.2s) plus process start-up cost more than they save:
+# one pass takes 0.34s at 64 courses, 0.57s at 96 and 0.98s at 128 (8 components: 0.30s on 8 CPUs, 0.68s on one)
+MIN_COURSES = 100
+# share of course needs that may find no slot group before decomposing is not worth it
+MAX_UNMATCHED = 0.1
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+def course_components(courses):
+    """Row positions of the course table grouped into independent components, in first-row order"""
+    uf = _UnionFind()
+    for i, (faculty, batch) in enumerate(zip(courses['Faculty1'], courses['BatchYear'])):
+        uf.union(('course', i), ('faculty', str(faculty)))
+        uf.union(('course', i), ('batch', str(batch)))
+    components = defaultdict(list)
+    for i in range(len(courses)):
+        components[uf.find(('course', i))].append(i)
+    return sorted(components.values(), key=lambda rows: rows[0])
+
+
+def _ltp(value):
+    """(L, T, P) hours; malformed values count as none, as in TimetableScheduler.parse_ltp"""
+    try:
+        l, t, p = (int(x) for x in str(value).split('-'))
+        return l, t, p
+    except ValueError:
+        return 0, 0, 0
+
+
+def _needs(courses, rows):
+    """Slot groups a component asks for: [(batch, faculty set, SlotType, hours)].
+
+    A lab course asks for one 3-hour lab slot and its L+T hours for a theory group;
+    an elective basket asks once, for its longest member's hours and every member's faculty.
+    """
+    needs, baskets = [], {}
+    part = courses.iloc[rows]
+    basket_column = part['Basket'] if 'Basket' in part.columns else [''] * len(part)
+    for ltp, batch, faculty, basket in zip(part['L-T-P'], part['BatchYear'], part['Faculty1'], basket_column):
+        l, t, p = _ltp(ltp)
+        batch, faculty = str(batch), str(faculty)
+        if p:
+            needs.append((batch, {faculty}, 'Lab', 3))
+        if l + t and basket:
+            need = baskets.setdefault((basket, batch), [batch, set(), 'Theory', 0])
+            need[1].add(faculty)
+            need[3] = max(need[3], l + t)
+        elif l + t:
+            needs.append((batch, {faculty}, 'Theory', l + t))
+    return needs + [tuple(need) for need in baskets.values()]
+
+
+def partition_slots(slot_master, courses, components, grid):
+    """Give each component the whole slot groups its courses fit; returns (frames, unmatched needs).
+
+    Needs are matched labs first, then longest first, each to the free group of its
+    SlotType whose hours fit it most closely (the scheduler's own rule) and whose
+    cells do not overlap a group already given to the same batch or faculty. Groups
+    nobody fits stay out of every partition and are left for the final pass.
+    """
+    group_of = slot_master['SlotCode'].str.split('(').str[0].str.strip()
+    groups = {}  # group -> [SlotType, hours, cell mask]
+    for group, slot_type, duration, day, start, end in zip(group_of, slot_master['SlotType'], slot_master['Duration'],
+                                                           slot_master['Day'], slot_master['StartTime'],
+                                                           slot_master['EndTime']):
+        entry = groups.setdefault(group, [slot_type, 0, 0])
+        entry[1] += int(duration)
+        entry[2] |= grid.mask(day, time_to_minutes(start), time_to_minutes(end))
+
+    needs = [(c, need) for c, rows in enumerate(components) for need in _needs(courses, rows)]
+    needs.sort(key=lambda item: (item[1][2] != 'Lab', -item[1][3]))  # stable: component order breaks ties
+    owner = {}
+    busy = defaultdict(int)  # (component, 'batch' / 'faculty', name) -> cells already given out
+
+    def free_groups(c, batch, faculty, kind):
+        keys = [(c, 'batch', batch)] + [(c, 'faculty', f) for f in faculty]
+        taken = 0
+        for key in keys:
+            taken |= busy[key]
+        return keys, [(total, group) for group, (slot_type, total, mask) in groups.items()
+                      if group not in owner and slot_type == kind and not mask & taken]
+
+    def give(c, keys, group):
+        owner[group] = c
+        for key in keys:
+            busy[key] |= groups[group][2]
+
+    short = []
+    for c, (batch, faculty, kind, hours) in needs:
+        keys, free = free_groups(c, batch, faculty, kind)
+        fits = [(total - hours, group) for total, group in free if total >= hours]
+        if fits:
+            give(c, keys, min(fits)[1])
+        else:
+            short.append((c, (batch, faculty, kind, hours)))
+
+    # no single group is long enough: cover the hours with smaller groups, as the scheduler's fallback would
+    unmatched = 0
+    for c, (batch, faculty, kind, hours) in short:
+        while hours > 0:
+            keys, free = free_groups(c, batch, faculty, kind)
+            if not free:
+                unmatched += 1
+                break
+            total, group = max(free)
+            give(c, keys, group)
+            hours -= total
+    return [slot_master[group_of.map(owner) == c].reset_index(drop=True) for c in range(len(components))], unmatched
+
+
+def _solve_component(courses, slot_master, grid, ordering):
+    scheduler = TimetableScheduler(courses, slot_master, grid=grid, ordering=ordering)
+    return pack_schedule(scheduler.generate_schedule()), scheduler.fallback_courses
+
+
+def _single_pass(courses, slot_master, grid, ordering, components):
+    scheduler = TimetableScheduler(courses, slot_master, grid=grid, ordering=ordering)
+    scheduler.generate_schedule()
+    scheduler.components = components
+    return scheduler
+
+
+def schedule_decomposed(courses, slot_master, workers=None, grid=None, ordering='priority',
+                        min_courses=MIN_COURSES):
+    """Schedule courses component by component in parallel; returns the finished TimetableScheduler.
+
+    Small inputs, or inputs that form a single component, run as one ordinary
+    scheduler. The returned scheduler's schedule and get_stats() cover every course.
+    """
+    grid = grid or grid_for(slot_master)
+    components = course_components(courses)
+    if len(components) < 2 or len(courses) < min_courses:
+        return _single_pass(courses, slot_master, grid, ordering, len(components))
+
+    parts, unmatched = partition_slots(slot_master, courses, components, grid)
+    if unmatched > MAX_UNMATCHED * len(courses):
+        # more demand than slot groups: starved partitions would leave the final pass redoing most of the work
+        return _single_pass(courses, slot_master, grid, ordering, len(components))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        solved = list(pool.map(_solve_component, [courses.iloc[rows] for rows in components], parts,
+                               [grid] * len(components), [ordering] * len(components)))
+
+    # merge complete courses in component order; the final pass schedules the rest whole on every leftover slot
+    required = {(code, batch): sum(_ltp(ltp))
+                for code, batch, ltp in zip(courses['SubjectCode'], courses['BatchYear'], courses['L-T-P'])}
+    placed = defaultdict(list)
+    for packed, _ in solved:
+        for sessions in unpack_schedule(packed).values():
+            for s in sessions:
+                placed[(s.course_code, s.batch)].append(s)
+    scheduler = TimetableScheduler(courses, slot_master, grid=grid, ordering=ordering)
+    complete = {key for key, sessions in placed.items() if sum(s.duration for s in sessions) >= required.get(key, 0)}
+    scheduler.adopt_sessions([s for key, sessions in placed.items() if key in complete for s in sessions])
+    scheduler.generate_schedule()
+    for _, fallbacks in solved:
+        scheduler.fallback_courses |= fallbacks & complete
+    scheduler.pinned.clear()  # pinned_courses counts a user's warm start, not the merge
+    scheduler.components = len(components)
+    return scheduler
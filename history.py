@@ -0,0 +1,476 @@
+"""Versioned edit history for a timetable: a base snapshot plus one delta per adjustment.
+
+A delta only records the sessions that changed between two versions:
+
+    moves    (key, session before, day, time, slot)   same session, new place
+    removed  (key, session)
+    added    (key, session)
+
+where a session is the tuple of its SessionRecord fields. Sessions are
+compared as multisets, so reordering a course's sessions is not a change.
+The base is kept packed (session_record.pack_schedule); the current version
+is kept as that multiset, so a commit, undo or redo only touches the
+sessions in its delta. Once more than max_undo versions pile up, the oldest
+deltas are folded into the base (compaction), so a long editing session
+keeps at most max_undo + compact_every small deltas.
+
+HistoryStore keeps every history in a log file of its own (one JSON line
+for the base, then one per commit, undo or redo), so all server processes
+share it and an edit costs one appended line.
+"""
+import base64
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl  # serializes edits across server processes
+except ImportError:  # Windows: a single server process, the thread lock is enough
+    fcntl = None
+
+from session_record import SessionRecord, pack_schedule, schedule_from_dicts, unpack_schedule
+
+_PLACE = tuple(SessionRecord.FIELDS.index(f) for f in ('day', 'time', 'slot'))
+# everything but the placement identifies a session across a move
+_IDENTITY = tuple(i for i in range(len(SessionRecord.FIELDS)) if i not in _PLACE)
+
+
+def _rows(schedule):
+    return Counter((key, tuple(s.get(f) for f in SessionRecord.FIELDS))
+                   for key, sessions in schedule_from_dicts(schedule).items() for s in sessions)
+
+
+def _schedule(rows):
+    result = defaultdict(list)
+    for (key, row), count in rows.items():
+        for _ in range(count):
+            result[key].append(SessionRecord(*row))
+    return result
+
+
+def _identity(row):
+    return tuple(row[i] for i in _IDENTITY)
+
+
+def _moved(row, day, time_, slot):
+    values = list(row)
+    for index, value in zip(_PLACE, (day, time_, slot)):
+        values[index] = value
+    return tuple(values)
+
+
+def _diff(old_rows, new_rows):
+    removed = list((old_rows - new_rows).elements())
+    added = list((new_rows - old_rows).elements())
+
+    # a removed and an added session of the same course that differ only in place are a move
+    arrivals = defaultdict(list)
+    for key, row in added:
+        arrivals[(key, _identity(row))].append(row)
+    moves, gone = [], []
+    for key, row in removed:
+        targets = arrivals.get((key, _identity(row)))
+        if targets:
+            target = targets.pop(0)
+            moves.append((key, row) + tuple(target[i] for i in _PLACE))
+        else:
+            gone.append((key, row))
+    arrived = [(key, row) for (key, _), rows in arrivals.items() for row in rows]
+    return {'moves': moves, 'removed': gone, 'added': arrived}
+
+
+def _apply(rows, delta):
+    """Apply delta to a session multiset in place; raises ValueError (rows untouched) if it does not fit"""
+    taken = Counter((key, row) for key, row, *_ in delta['moves'])
+    taken.update((key, row) for key, row in delta['removed'])
+    for (key, row), count in taken.items():
+        if rows[(key, row)] < count:
+            raise ValueError(f"Session of {key} to change is not in the schedule")
+    for (key, row), count in taken.items():
+        rows[(key, row)] -= count
+        if not rows[(key, row)]:
+            del rows[(key, row)]
+    for key, row, *place in delta['moves']:
+        rows[(key, _moved(row, *place))] += 1
+    for key, row in delta['added']:
+        rows[(key, row)] += 1
+
+
+def make_delta(old, new):
+    """The changes that turn schedule old into schedule new"""
+    return _diff(_rows(old), _rows(new))
+
+
+def invert_delta(delta):
+    return {
+        'moves': [(key, _moved(row, *place), *(row[i] for i in _PLACE))
+                  for key, row, *place in delta['moves']],
+        'removed': delta['added'],
+        'added': delta['removed'],
+    }
+
+
+def apply_delta(schedule, delta):
+    """New schedule with the delta applied; raises ValueError if it does not fit"""
+    rows = _rows(schedule)
+    _apply(rows, delta)
+    return _schedule(rows)
+
+
+def delta_size(delta):
+    return len(delta['moves']) + len(delta['removed']) + len(delta['added'])
+
+
+def describe_delta(delta):
+    """JSON-ready form of a delta: moved sessions with from/to, removed and added sessions"""
+    def session(key, row):
+        return dict(zip(SessionRecord.FIELDS, row), key=key)
+
+    def place(values):
+        return dict(zip(('day', 'time', 'slot'), values))
+
+    moved = []
+    for key, row, *target in delta['moves']:
+        entry = session(key, row)
+        entry['from'] = place(row[i] for i in _PLACE)
+        entry['to'] = place(target)
+        moved.append(entry)
+    return {
+        'moved': moved,
+        'removed': [session(key, row) for key, row in delta['removed']],
+        'added': [session(key, row) for key, row in delta['added']],
+    }
+
+
+def parse_delta(data):
+    """Inverse of describe_delta, for deltas posted by a client; 'from' is not needed"""
+    def row(entry):
+        record = SessionRecord.from_dict(entry)
+        return tuple(record.get(f) for f in SessionRecord.FIELDS)
+
+    try:
+        return {
+            'moves': [(e['key'], row(e), e['to']['day'], e['to']['time'], e['to'].get('slot') or '')
+                      for e in data.get('moved', [])],
+            'removed': [(e['key'], row(e)) for e in data.get('removed', [])],
+            'added': [(e['key'], row(e)) for e in data.get('added', [])],
+        }
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Malformed delta: {e}")
+
+
+def _delta_to_json(delta):
+    return {part: [list(entry[:1]) + [list(entry[1])] + list(entry[2:]) for entry in entries]
+            for part, entries in delta.items()}
+
+
+def _delta_from_json(data):
+    return {part: [(entry[0], tuple(entry[1]), *entry[2:]) for entry in entries] for part, entries in data.items()}
+
+
+class VersionConflict(ValueError):
+    """The edit was made on another version than the history's current one"""
+
+    def __init__(self, message, version):
+        super().__init__(message)
+        self.version = version
+
+
+class ScheduleHistory:
+    def __init__(self, schedule, max_undo=50, compact_every=10, base_version=0, created=None):
+        schedule = schedule_from_dicts(schedule)
+        self.base = pack_schedule(schedule)
+        self.base_version = base_version
+        self.deltas = []            # deltas[i] turns version base_version + i into the next one
+        self.times = [created or time.time()]  # creation time per kept version
+        self.version = base_version  # the version being edited (lower than latest after an undo)
+        self.max_undo = max_undo
+        self.compact_every = compact_every
+        self._rows = _rows(schedule)  # the current version as a session multiset
+        self.lock = threading.Lock()  # held by the store while it changes the history, and by readers
+
+    @property
+    def latest(self):
+        return self.base_version + len(self.deltas)
+
+    def current(self):
+        return _schedule(self._rows)
+
+    def commit(self, schedule):
+        """Record schedule as the next version; drops the redo tail. Returns the new version."""
+        return self.commit_delta(_diff(self._rows, _rows(schedule)))
+
+    def commit_delta(self, delta, created=None):
+        """Apply delta to the current version and record the result as the next version"""
+        if not delta_size(delta):
+            return self.version
+        _apply(self._rows, delta)
+        keep = self.version - self.base_version
+        del self.deltas[keep:]
+        del self.times[keep + 1:]
+        self.deltas.append(delta)
+        self.times.append(created or time.time())
+        self.version += 1
+        if len(self.deltas) >= self.max_undo + self.compact_every:
+            self.compact()
+        return self.version
+
+    def can_undo(self):
+        return self.version > self.base_version
+
+    def can_redo(self):
+        return self.version < self.latest
+
+    def undo(self):
+        if not self.can_undo():
+            raise ValueError("Nothing to undo.")
+        return self.step_to(self.version - 1)
+
+    def redo(self):
+        if not self.can_redo():
+            raise ValueError("Nothing to redo.")
+        return self.step_to(self.version + 1)
+
+    def step_to(self, version):
+        """Walk the current version to another kept one by applying deltas backwards or forwards"""
+        if not self.base_version <= version <= self.latest:
+            raise ValueError(f"Version {version} is not kept (versions {self.base_version}-{self.latest}).")
+        while self.version > version:
+            _apply(self._rows, invert_delta(self.deltas[self.version - self.base_version - 1]))
+            self.version -= 1
+        while self.version < version:
+            _apply(self._rows, self.deltas[self.version - self.base_version])
+            self.version += 1
+        return self.version
+
+    def checkout(self, version):
+        """The schedule as it was at a kept version"""
+        if not self.base_version <= version <= self.latest:
+            raise ValueError(f"Version {version} is not kept (versions {self.base_version}-{self.latest}).")
+        rows = _rows(unpack_schedule(self.base))
+        for delta in self.deltas[:version - self.base_version]:
+            _apply(rows, delta)
+        return _schedule(rows)
+
+    def diff(self, start, end):
+        """Delta from version start to version end (either direction)"""
+        return make_delta(self.checkout(start), self.checkout(end))
+
+    def compact(self):
+        """Fold all but the newest max_undo deltas into the base; the versions folded cannot be undone"""
+        fold = min(len(self.deltas) - self.max_undo, self.version - self.base_version)
+        if fold <= 0:
+            return 0
+        self.base = pack_schedule(self.checkout(self.base_version + fold))
+        self.base_version += fold
+        del self.deltas[:fold]
+        del self.times[:fold]
+        return fold
+
+    def log(self):
+        """One entry per kept version, oldest first"""
+        entries = [{'version': self.base_version, 'created': self.times[0], 'changes': 0}]
+        for i, delta in enumerate(self.deltas, 1):
+            entries.append({'version': self.base_version + i, 'created': self.times[i],
+                            'changes': delta_size(delta)})
+        for entry in entries:
+            entry['current'] = entry['version'] == self.version
+        return entries
+
+    def entries(self):
+        """The log lines that rebuild this history: base, one per kept delta, then the current version"""
+        yield {'base': base64.b64encode(self.base).decode('ascii'), 'version': self.base_version,
+               'created': self.times[0]}
+        for i, delta in enumerate(self.deltas, 1):
+            yield {'commit': _delta_to_json(delta), 'version': self.base_version + i, 'created': self.times[i]}
+        if self.version != self.latest:
+            yield {'version': self.version}
+
+
+def _replay(history, entry):
+    """Apply one log line to history (None before the base line); returns the history"""
+    if 'base' in entry:
+        return ScheduleHistory(unpack_schedule(base64.b64decode(entry['base'])),
+                               base_version=entry['version'], created=entry['created'])
+    if 'commit' in entry:
+        history.step_to(entry['version'] - 1)
+        history.commit_delta(_delta_from_json(entry['commit']), entry['created'])
+    else:
+        history.step_to(entry['version'])
+    return history
+
+
+def _line(entry):
+    return (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+_SAFE_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class HistoryStore:
+    """Histories by timetable session id, one log file each in directory, removed after ttl seconds unused.
+
+    Every process keeps the histories it has read in memory and only reads the
+    lines other processes appended since. A compaction rewrites the log file.
+    """
+
+    def __init__(self, directory, ttl=6 * 3600, max_entries=1000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = {}  # session id -> [log inode, bytes read, ScheduleHistory]
+        self._lock = threading.Lock()
+
+    def _path(self, session_id):
+        return self.directory / f'{session_id}.log' if _SAFE_ID.match(session_id or '') else None
+
+    def _prune(self, now):
+        logs = []
+        for path in self.directory.glob('*.log'):
+            try:
+                used = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if used < now - self.ttl:
+                path.unlink(missing_ok=True)
+            else:
+                logs.append((used, path))
+        logs.sort()
+        while len(logs) >= self.max_entries:
+            logs.pop(0)[1].unlink(missing_ok=True)
+        kept = {path.stem for _, path in logs}
+        for key in [k for k in self._cache if k not in kept]:
+            del self._cache[key]
+
+    def _read(self, session_id, f):
+        """Bring the cached history up to date with the open log file; None if it has no base yet"""
+        inode = os.fstat(f.fileno()).st_ino
+        cached = self._cache.get(session_id)
+        if cached is None or cached[0] != inode:
+            cached = [inode, 0, None]
+        f.seek(cached[1])
+        data = f.read()
+        data = data[:data.rfind(b'\n') + 1]  # a line still being written is read next time
+        if data:
+            history = cached[2]
+            lock = history.lock if history is not None else threading.Lock()
+            with lock:
+                for line in data.splitlines():
+                    history = _replay(history, json.loads(line))
+            cached[1] += len(data)
+            cached[2] = history
+        self._cache[session_id] = cached
+        return cached[2]
+
+    def start(self, session_id, schedule):
+        """New history with schedule as version 0; the existing one if another request started it first"""
+        path = self._path(session_id)
+        if path is None:
+            raise ValueError("Invalid session id.")
+        history = ScheduleHistory(schedule)
+        data = b''.join(_line(entry) for entry in history.entries())
+        with self._lock:
+            self._prune(time.time())
+            tmp = path.with_name(f'{session_id}.{uuid.uuid4().hex}.tmp')
+            tmp.write_bytes(data)
+            try:
+                os.link(tmp, path)  # only creates the log if no other process did
+                self._cache[session_id] = [path.stat().st_ino, len(data), history]
+                return history
+            except FileExistsError:
+                pass
+            finally:
+                tmp.unlink()
+        return self.get(session_id)
+
+    def get(self, session_id):
+        path = self._path(session_id)
+        if path is None:
+            return None
+        with self._lock:
+            try:
+                with open(path, 'rb') as f:
+                    history = self._read(session_id, f)
+                os.utime(path)  # reading counts as use for the ttl
+            except FileNotFoundError:
+                self._cache.pop(session_id, None)
+                return None
+            return history
+
+    @contextmanager
+    def _editing(self, session_id, expected):
+        """The history, up to date and locked against every other writer; yields (history, append)"""
+        path = self._path(session_id)
+        if path is None:
+            raise KeyError(session_id)
+        with self._lock:
+            while True:
+                try:
+                    f = open(path, 'r+b')
+                except FileNotFoundError:
+                    self._cache.pop(session_id, None)
+                    raise KeyError(session_id)
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    same = os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+                except FileNotFoundError:
+                    same = False
+                if same:
+                    break
+                f.close()  # compacted or removed while we waited for the lock
+            with f:
+                history = self._read(session_id, f)
+                if history is None:
+                    raise KeyError(session_id)
+                with history.lock:
+                    if expected is not None and expected != history.version:
+                        raise VersionConflict(f"The timetable is at version {history.version}, not {expected}: "
+                                              "it was changed elsewhere.", history.version)
+                    base_version = history.base_version
+                    lines = []
+                    yield history, lines.append
+                    if history.base_version != base_version:
+                        self._rewrite(session_id, path, history)  # compacted
+                    elif lines:
+                        data = b''.join(_line(entry) for entry in lines)
+                        f.seek(0, os.SEEK_END)
+                        f.write(data)
+                        f.flush()
+                        self._cache[session_id][1] += len(data)
+
+    def _rewrite(self, session_id, path, history):
+        data = b''.join(_line(entry) for entry in history.entries())
+        tmp = path.with_name(f'{session_id}.{uuid.uuid4().hex}.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self._cache[session_id] = [path.stat().st_ino, len(data), history]
+
+    def commit(self, session_id, schedule=None, delta=None, expected=None):
+        """Record an edit, given as the edited schedule or as its delta, made on version expected.
+
+        Returns (history, new version); raises KeyError for an unknown history, VersionConflict
+        if expected is not the current version and ValueError if the delta does not fit.
+        """
+        with self._editing(session_id, expected) as (history, append):
+            if delta is None:
+                delta = _diff(history._rows, _rows(schedule))
+            version = history.version
+            if history.commit_delta(delta) != version:
+                append({'commit': _delta_to_json(delta), 'version': history.version,
+                        'created': history.times[-1]})
+            return history, history.version
+
+    def step(self, session_id, action, expected=None):
+        """Undo or redo one version; same errors as commit"""
+        with self._editing(session_id, expected) as (history, append):
+            version = history.undo() if action == 'undo' else history.redo()
+            append({'version': version})
+            return history, version
@@ -0,0 +1,93 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+
+class Job:
+    """State of one background generation run"""
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = 'queued'  # queued -> running -> done / failed
+        self.stage = 'queued'
+        self.progress = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.version = 0  # bumped on every change so listeners can wait for updates
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'error': self.error,
+        }
+
+
+class JobQueue:
+    """Runs generation jobs on a local worker pool and keeps their results in memory"""
+
+    def __init__(self, max_workers=4, ttl=3600):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='timetable-job')
+        self.ttl = ttl  # seconds a finished job is kept before it is dropped
+        self.jobs = {}
+        self.changed = threading.Condition()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, progress=..., **kwargs) and return the job id immediately"""
+        self._expire()
+        job = Job(str(uuid.uuid4()))
+        with self.changed:
+            self.jobs[job.id] = job
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        self._expire()
+        with self.changed:
+            return self.jobs.get(job_id)
+
+    def wait(self, job_id, version, timeout=15):
+        """Block until the job changes past version (or timeout) and return it"""
+        self._expire()
+        with self.changed:
+            self.changed.wait_for(
+                lambda: job_id not in self.jobs or self.jobs[job_id].version != version,
+                timeout=timeout)
+            return self.jobs.get(job_id)
+
+    def _update(self, job, **fields):
+        with self.changed:
+            for key, value in fields.items():
+                setattr(job, key, value)
+            job.version += 1
+            self.changed.notify_all()
+
+    def _run(self, job, fn, args, kwargs):
+        self._update(job, status='running', stage='starting', progress=1)
+
+        def progress(stage, percent):
+            self._update(job, stage=stage, progress=percent)
+
+        try:
+            result = fn(*args, progress=progress, **kwargs)
+        except Exception as e:
+            error_detail = f"Error: {str(e)}\n\n{traceback.format_exc()}"
+            metrics.ERRORS.inc(endpoint='job')
+            self._update(job, status='failed', stage='failed', error=error_detail, finished=time.time())
+        else:
+            self._update(job, status='done', stage='done', progress=100, result=result, finished=time.time())
+
+    def _expire(self):
+        """Drop finished jobs older than ttl; runs on every submit, get and wait"""
+        cutoff = time.time() - self.ttl
+        with self.changed:
+            for job_id in [j.id for j in self.jobs.values() if j.finished and j.finished < cutoff]:
+                del self.jobs[job_id]
@@ -0,0 +1,263 @@
+"""Offline load test for the web app.
+
+    python loadtest.py --users 8 --iterations 5 --courses 60
+    python loadtest.py --processes 4 --users 4          # 4 app instances x 4 users
+    python loadtest.py --url http://127.0.0.1:5000      # a running server
+
+Each virtual user uploads a synthetic workbook to /generate, posts an
+edited schedule to /adjust and downloads the Excel export, in a loop.
+By default every worker process runs its own copy of the app through the
+Flask test client, so the numbers cover the app itself without a network
+or WSGI server; --url sends real HTTP requests instead. The report lists
+throughput, p50/p95/p99 latency per endpoint and peak RSS per worker
+(in-process mode only; for --url watch the server's own /metrics).
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+
+ENDPOINTS = ('generate', 'adjust', 'download')
+
+
+def make_workbook(courses=40, batches=4, faculty=None, seed=0):
+    """Synthetic course workbook in the upload template format; returns xlsx bytes"""
+    rng = random.Random(seed)
+    faculty = faculty or max(2, courses // 2)
+    rows = []
+    for i in range(courses):
+        lab = rng.random() < 0.25
+        rows.append({
+            'Subject Number': f'SY{10000 + i}',
+            'Subject Name': f'Synthetic Course {i}',
+            'L-T-P': '0-0-3' if lab else rng.choice(['3-0-0', '3-1-0', '2-1-0', '1-0-3']),
+            'Teacher(s)': f'F{rng.randrange(faculty)}',
+            'Type': 'Lab' if lab else 'Core',
+            'Batch': rng.randint(1, batches),
+            'Room': f'R{rng.randrange(10)}' if lab else '',
+        })
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        pd.DataFrame(rows).to_excel(writer, index=False, sheet_name='Sheet1')
+    return output.getvalue()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def _multipart(fields, files):
+    """Encode form fields and (name, filename, bytes) files for urllib"""
+    boundary = uuid.uuid4().hex
+    body = BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, data in files:
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                   f'Content-Type: application/octet-stream\r\n\r\n'.encode())
+        body.write(data + b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+class TestClientUser:
+    """One virtual user talking to an in-process app"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def post(self, path, data):
+        response = self.client.post(path, data=data, content_type='multipart/form-data')
+        return response.status_code, response.headers, response.get_data()
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.headers, response.get_data()
+
+
+class HttpUser:
+    """One virtual user talking to a running server (keeps its own session cookie)"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def _open(self, req):
+        try:
+            with self.opener.open(req, timeout=300) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def post(self, path, data):
+        files = [(k, v[1], v[0].getvalue()) for k, v in data.items() if isinstance(v, tuple)]
+        fields = {k: v for k, v in data.items() if not isinstance(v, tuple)}
+        body, content_type = _multipart(fields, files)
+        return self._open(urllib.request.Request(self.base_url + path, data=body,
+                                                 headers={'Content-Type': content_type}))
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+
+
+def run_user(user, workbook, edited_schedule, iterations, record):
+    """generate -> adjust -> download, `iterations` times"""
+    for _ in range(iterations):
+        start = time.perf_counter()
+        status, headers, _ = user.post('/generate', {'file': (BytesIO(workbook), 'load.xlsx')})
+        session_id = headers.get('X-Session-Id')
+        if status == 200 and not session_id:
+            status = 500  # the app shows pipeline failures as an error page with 200
+        record('generate', time.perf_counter() - start, status)
+        if status != 200:
+            continue
+
+        start = time.perf_counter()
+        status, _, _ = user.post('/adjust', {'session_id': session_id, 'schedule': edited_schedule})
+        record('adjust', time.perf_counter() - start, status)
+
+        start = time.perf_counter()
+        status, headers, _ = user.get(f'/download/{session_id}')
+        if status == 200 and 'spreadsheetml' not in headers.get('Content-Type', ''):
+            status = 500  # error page instead of the workbook
+        record('download', time.perf_counter() - start, status)
+
+
+def edited_schedule_for(workbook):
+    """Schedule JSON for /adjust: the generated timetable with one session moved a day later"""
+    from api import build_result
+    from pipeline import load_time_grid
+    days = load_time_grid().days
+    schedule = build_result(workbook)['schedule']
+    for sessions in schedule.values():
+        if sessions and sessions[0]['day'] in days:
+            sessions[0]['day'] = days[(days.index(sessions[0]['day']) + 1) % len(days)]
+            break
+    return json.dumps(schedule)
+
+
+def run_worker(worker, users, iterations, workbooks, edited, url=None):
+    """One worker process: `users` threads against its own app (or the server at url)"""
+    if url is None:
+        from app import app
+        make_user = lambda: TestClientUser(app)
+    else:
+        make_user = lambda: HttpUser(url)
+
+    samples = []
+    lock = threading.Lock()
+
+    def record(endpoint, seconds, status):
+        with lock:
+            samples.append((endpoint, seconds, status))
+
+    threads = [threading.Thread(target=run_user,
+                                args=(make_user(), workbooks[i % len(workbooks)], edited[i % len(edited)],
+                                      iterations, record))
+               for i in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        'worker': worker,
+        'pid': os.getpid(),
+        'seconds': time.perf_counter() - start,
+        # the app's memory only when it runs in this process; KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if url is None else None,
+        'samples': samples,
+    }
+
+
+def summarize(results, elapsed):
+    by_endpoint = defaultdict(list)
+    errors = defaultdict(int)
+    for result in results:
+        for endpoint, seconds, status in result['samples']:
+            by_endpoint[endpoint].append(seconds)
+            if status >= 400:
+                errors[endpoint] += 1
+    total = sum(len(v) for v in by_endpoint.values())
+    return {
+        'elapsed_s': elapsed,
+        'requests': total,
+        'throughput_rps': total / elapsed if elapsed else 0.0,
+        'generate_per_s': (len(by_endpoint['generate']) - errors['generate']) / elapsed if elapsed else 0.0,
+        'endpoints': {
+            endpoint: {
+                'count': len(values),
+                'errors': errors[endpoint],
+                'p50_ms': percentile(values, 50) * 1000,
+                'p95_ms': percentile(values, 95) * 1000,
+                'p99_ms': percentile(values, 99) * 1000,
+                'max_ms': max(values) * 1000 if values else 0.0,
+            } for endpoint, values in ((e, by_endpoint[e]) for e in ENDPOINTS)
+        },
+        'workers': [{'worker': r['worker'], 'pid': r['pid'], 'requests': len(r['samples']),
+                     'peak_rss_mb': r['peak_rss_mb']} for r in results],
+    }
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['elapsed_s']:.2f}s: "
+          f"{report['throughput_rps']:.2f} req/s, {report['generate_per_s']:.2f} timetables/s")
+    print(f"{'endpoint':10} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for endpoint, row in report['endpoints'].items():
+        print(f"{endpoint:10} {row['count']:6} {row['errors']:6} {row['p50_ms']:9.1f} {row['p95_ms']:9.1f} "
+              f"{row['p99_ms']:9.1f} {row['max_ms']:9.1f}")
+    for worker in report['workers']:
+        memory = f", peak RSS {worker['peak_rss_mb']:.1f} MB" if worker['peak_rss_mb'] is not None else ''
+        print(f"worker {worker['worker']} (pid {worker['pid']}): {worker['requests']} requests{memory}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test /generate, /adjust and /download")
+    parser.add_argument('--users', type=int, default=4, help="concurrent users (threads) per worker process")
+    parser.add_argument('--processes', type=int, default=1, help="worker processes, each with its own app")
+    parser.add_argument('--iterations', type=int, default=3, help="generate/adjust/download rounds per user")
+    parser.add_argument('--courses', type=int, default=40, help="courses per synthetic workbook")
+    parser.add_argument('--batches', type=int, default=4, help="batches per synthetic workbook")
+    parser.add_argument('--workbooks', type=int, default=4, help="distinct synthetic workbooks to rotate through")
+    parser.add_argument('--url', help="test a running server instead of in-process apps")
+    parser.add_argument('--json', metavar='PATH', help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    workbooks = [make_workbook(args.courses, args.batches, seed=i) for i in range(args.workbooks)]
+    edited = [edited_schedule_for(w) for w in workbooks]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        futures = [pool.submit(run_worker, i, args.users, args.iterations, workbooks, edited, args.url)
+                   for i in range(args.processes)]
+        results = [future.result() for future in futures]
+    report = summarize(results, time.perf_counter() - start)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    failed = sum(row['errors'] for row in report['endpoints'].values())
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Recording is a dict lookup, a bisect and a few additions under a lock, so it
+is cheap enough for the request path. Values are per process: each web
+worker exports its own numbers and the scraper aggregates them.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_registry = []
+
+
+def _label_text(names, values, extra=''):
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, '') for n in self.labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_label_text(self.labels, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, buckets, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # label values -> [per-bucket counts (+Inf last), sum, count]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, '') for n in self.labels)
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_label_text(self.labels, key)} {total}')
+            lines.append(f'{self.name}_count{_label_text(self.labels, key)} {count}')
+        return lines
+
+
+def render_all():
+    """All registered metrics as Prometheus exposition text"""
+    with _lock:
+        lines = [line for metric in _registry for line in metric.render()]
+    return '\n'.join(lines) + '\n'
+
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+REQUEST_LATENCY = Histogram('timetable_request_duration_seconds',
+                            'Request latency by endpoint', LATENCY_BUCKETS, labels=('endpoint',))
+PHASE_LATENCY = Histogram('timetable_phase_duration_seconds',
+                          'Time spent in each generation phase', LATENCY_BUCKETS, labels=('phase',))
+RUN_COURSES = Histogram('timetable_run_courses', 'Course rows per scheduling run', COUNT_BUCKETS)
+RUN_SESSIONS = Histogram('timetable_run_sessions', 'Sessions placed per scheduling run', COUNT_BUCKETS)
+RUN_UNPLACED_HOURS = Histogram('timetable_run_unplaced_hours',
+                               'Required hours left unplaced per scheduling run', COUNT_BUCKETS)
+CACHE_REQUESTS = Counter('timetable_cache_requests_total',
+                         'Cache lookups by cache and result', labels=('cache', 'result'))
+ERRORS = Counter('timetable_errors_total', 'Failed requests and jobs by endpoint', labels=('endpoint',))
@@ -0,0 +1,292 @@
+"""Local-search post-pass that improves a finished schedule.
+
+Simulated annealing over two moves: shift a session into a free slot of the
+same type and length, or swap the slots of two such sessions. Hard
+constraints (no faculty, batch or room overlap, one session per slot code)
+are kept; the soft score is
+
+    idle gaps   hours a batch waits between its first and last class of a day
+    faculty days  distinct teaching days per faculty member
+    repeats     extra sessions of the same course for a batch on one day
+
+Occupancy is kept as per-cell counts (cells of the shared TimeGrid) per
+(batch, day), (faculty, day) and (room, day),
+so a move only re-scores the handful of keys it touches (delta evaluation)
+instead of the whole timetable.
+"""
+import math
+import random
+import time
+from collections import defaultdict
+
+from session_record import SessionRecord, format_slot_time, schedule_from_dicts, time_to_minutes
+from timegrid import DEFAULT_GRID, grid_for
+
+DEFAULT_WEIGHTS = {'idle_gaps': 1.0, 'faculty_days': 0.5, 'same_day_repeats': 2.0}
+
+
+def _gap(counts):
+    occupied = [h for h, c in enumerate(counts) if c]
+    if not occupied:
+        return 0
+    return occupied[-1] - occupied[0] + 1 - len(occupied)
+
+
+def quality_penalties(schedule, weights=None, grid=DEFAULT_GRID):
+    """Score a whole schedule (lower is better); used to compare alternatives"""
+    weights = weights or DEFAULT_WEIGHTS
+    schedule = schedule_from_dicts(schedule)
+    batch_hours = defaultdict(lambda: [0] * grid.slots_per_day)
+    faculty_days = defaultdict(set)
+    course_day = defaultdict(int)
+    for sessions in schedule.values():
+        for s in sessions:
+            for h in grid.span(s.start, s.end):
+                batch_hours[(s.batch, s.day)][h] += 1
+            faculty_days[s.faculty].add(s.day)
+            course_day[(s.course_code, s.batch, s.day)] += 1
+
+    result = {
+        'idle_gaps': sum(_gap(counts) for counts in batch_hours.values()),
+        'faculty_days': sum(len(days) for days in faculty_days.values()),
+        'same_day_repeats': sum(c - 1 for c in course_day.values() if c > 1),
+    }
+    result['score'] = sum(weights[k] * result[k] for k in DEFAULT_WEIGHTS)
+    return result
+
+
+class ScheduleOptimizer:
+    def __init__(self, schedule, slot_master, weights=None, seed=0, faculty_unavailable=None, grid=None):
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.random = random.Random(seed)
+        self.grid = grid = grid or grid_for(slot_master)
+        # per-faculty availability bitmaps compiled by the scheduler; moves never enter a blocked slot
+        self.faculty_unavailable = faculty_unavailable or {}
+        self.slot_masks = {}
+
+        # slot code -> (day, cells, bucket, time string); bucket = (SlotType, Duration)
+        self.slot_info = {}
+        for _, slot in slot_master.iterrows():
+            start = time_to_minutes(slot['StartTime'])
+            end = time_to_minutes(slot['EndTime'])
+            self.slot_masks[slot['SlotCode']] = grid.mask(slot['Day'], start, end)
+            self.slot_info[slot['SlotCode']] = (
+                slot['Day'], grid.span(start, end), (slot['SlotType'], int(slot['Duration'])),
+                f"{format_slot_time(slot['StartTime'])} - {format_slot_time(slot['EndTime'])}")
+
+        self.keys = []       # schedule key per session
+        self.sessions = []   # original records
+        self.position = []   # current slot code, None for sessions pinned to their own time
+        for key, sessions in schedule_from_dicts(schedule).items():
+            for s in sessions:
+                self.keys.append(key)
+                self.sessions.append(s)
+                # elective baskets share one slot, so their sessions stay where they are
+                self.position.append(s.slot if s.slot in self.slot_info and not s.basket else None)
+        self.original = list(self.position)
+
+        used = {s.slot for s in self.sessions}
+        self.free = defaultdict(list)
+        for code, info in self.slot_info.items():
+            if code not in used:
+                self.free[info[2]].append(code)
+
+        self.movable = [i for i, p in enumerate(self.position) if p]
+        self.by_bucket = defaultdict(list)
+        for i in self.movable:
+            self.by_bucket[self.slot_info[self.position[i]][2]].append(i)
+
+        self.batch_hours = defaultdict(lambda: [0] * grid.slots_per_day)
+        self.faculty_hours = defaultdict(lambda: [0] * grid.slots_per_day)
+        self.room_hours = defaultdict(lambda: [0] * grid.slots_per_day)  # sessions without a room are not tracked
+        self.faculty_day_count = defaultdict(lambda: defaultdict(int))
+        self.course_day = defaultdict(int)
+        for i in range(len(self.sessions)):
+            self._add(i, *self._placement(i, self.position[i]))
+
+    # --- occupancy bookkeeping -------------------------------------------------
+
+    def _placement(self, i, slot):
+        if slot is None:
+            s = self.sessions[i]
+            return s.day, self.grid.span(s.start, s.end)
+        day, hours, _, _ = self.slot_info[slot]
+        return day, hours
+
+    def _add(self, i, day, hours, delta=1):
+        s = self.sessions[i]
+        batch_counts = self.batch_hours[(s.batch, day)]
+        faculty_counts = self.faculty_hours[(s.faculty, day)]
+        for h in hours:
+            batch_counts[h] += delta
+            faculty_counts[h] += delta
+        if s.room:
+            room_counts = self.room_hours[(s.room, day)]
+            for h in hours:
+                room_counts[h] += delta
+        self.faculty_day_count[s.faculty][day] += delta
+        self.course_day[(s.course_code, s.batch, day)] += delta
+
+    def _remove(self, i, day, hours):
+        self._add(i, day, hours, -1)
+
+    def _fits(self, i, day, hours, slot):
+        s = self.sessions[i]
+        if self.slot_masks[slot] & self.faculty_unavailable.get(s.faculty, 0):
+            return False
+        batch_counts = self.batch_hours[(s.batch, day)]
+        faculty_counts = self.faculty_hours[(s.faculty, day)]
+        if any(batch_counts[h] or faculty_counts[h] for h in hours):
+            return False
+        if s.room:
+            room_counts = self.room_hours[(s.room, day)]
+            return not any(room_counts[h] for h in hours)
+        return True
+
+    # --- scoring ---------------------------------------------------------------
+
+    def _penalty(self, batch_days, faculties, course_days):
+        w = self.weights
+        gaps = sum(_gap(self.batch_hours[k]) for k in batch_days)
+        days = sum(sum(1 for c in self.faculty_day_count[f].values() if c) for f in faculties)
+        repeats = sum(max(0, self.course_day[k] - 1) for k in course_days)
+        return w['idle_gaps'] * gaps + w['faculty_days'] * days + w['same_day_repeats'] * repeats
+
+    def _affected(self, moves):
+        """Keys whose penalty can change when sessions move between the given days"""
+        batch_days, faculties, course_days = set(), set(), set()
+        for i, days in moves:
+            s = self.sessions[i]
+            faculties.add(s.faculty)
+            for day in days:
+                batch_days.add((s.batch, day))
+                course_days.add((s.course_code, s.batch, day))
+        return batch_days, faculties, course_days
+
+    def total_score(self):
+        return self._penalty(list(self.batch_hours), list(self.faculty_day_count), list(self.course_day))
+
+    # --- moves -----------------------------------------------------------------
+
+    def _try_shift(self, temperature):
+        i = self.random.choice(self.movable)
+        old_slot = self.position[i]
+        bucket = self.slot_info[old_slot][2]
+        if not self.free[bucket]:
+            return False
+        k = self.random.randrange(len(self.free[bucket]))
+        new_slot = self.free[bucket][k]
+        old_day, old_hours = self._placement(i, old_slot)
+        new_day, new_hours = self._placement(i, new_slot)
+
+        affected = self._affected([(i, (old_day, new_day))])
+        before = self._penalty(*affected)
+        self._remove(i, old_day, old_hours)
+        if not self._fits(i, new_day, new_hours, new_slot):
+            self._add(i, old_day, old_hours)
+            return False
+        self._add(i, new_day, new_hours)
+        delta = self._penalty(*affected) - before
+
+        if self._accept(delta, temperature):
+            self.position[i] = new_slot
+            self.free[bucket][k] = old_slot
+            self.score += delta
+            return True
+        self._remove(i, new_day, new_hours)
+        self._add(i, old_day, old_hours)
+        return False
+
+    def _try_swap(self, temperature):
+        i = self.random.choice(self.movable)
+        candidates = self.by_bucket[self.slot_info[self.position[i]][2]]
+        if len(candidates) < 2:
+            return False
+        j = self.random.choice(candidates)
+        if i == j:
+            return False
+        slot_i, slot_j = self.position[i], self.position[j]
+        day_i, hours_i = self._placement(i, slot_i)
+        day_j, hours_j = self._placement(j, slot_j)
+
+        affected = self._affected([(i, (day_i, day_j)), (j, (day_i, day_j))])
+        before = self._penalty(*affected)
+        self._remove(i, day_i, hours_i)
+        self._remove(j, day_j, hours_j)
+        ok = self._fits(i, day_j, hours_j, slot_j)
+        if ok:
+            self._add(i, day_j, hours_j)
+            ok = self._fits(j, day_i, hours_i, slot_i)
+            if not ok:
+                self._remove(i, day_j, hours_j)
+        if not ok:
+            self._add(i, day_i, hours_i)
+            self._add(j, day_j, hours_j)
+            return False
+        self._add(j, day_i, hours_i)
+        delta = self._penalty(*affected) - before
+
+        if self._accept(delta, temperature):
+            self.position[i], self.position[j] = slot_j, slot_i
+            self.score += delta
+            return True
+        self._remove(i, day_j, hours_j)
+        self._remove(j, day_i, hours_i)
+        self._add(i, day_i, hours_i)
+        self._add(j, day_j, hours_j)
+        return False
+
+    def _accept(self, delta, temperature):
+        return delta <= 0 or self.random.random() < math.exp(-delta / temperature)
+
+    # --- driver ----------------------------------------------------------------
+
+    def optimize(self, max_iterations=20000, time_limit=2.0, start_temperature=2.0, end_temperature=0.05):
+        """Anneal until the iteration or time budget runs out; returns (schedule, report)"""
+        self.score = initial = self.total_score()
+        best_score, best_position = self.score, list(self.position)
+        iterations = accepted = 0
+        deadline = time.perf_counter() + time_limit
+        cooling = (end_temperature / start_temperature) ** (1.0 / max(1, max_iterations))
+        temperature = start_temperature
+
+        while self.movable and iterations < max_iterations:
+            # checking the clock every iteration costs more than a move
+            if iterations % 256 == 0 and time.perf_counter() > deadline:
+                break
+            move = self._try_swap if self.random.random() < 0.5 else self._try_shift
+            if move(temperature):
+                accepted += 1
+                if self.score < best_score - 1e-9:
+                    best_score, best_position = self.score, list(self.position)
+            temperature *= cooling
+            iterations += 1
+
+        report = {
+            'initial_score': initial,
+            'final_score': best_score,
+            'iterations': iterations,
+            'accepted_moves': accepted,
+        }
+        return self._build(best_position), report
+
+    def _build(self, position):
+        schedule = defaultdict(list)
+        for i, s in enumerate(self.sessions):
+            slot = position[i]
+            if slot == self.original[i]:
+                schedule[self.keys[i]].append(s)
+                continue
+            day, _, _, time_str = self.slot_info[slot]
+            schedule[self.keys[i]].append(SessionRecord(
+                s.course_code, s.course_name, s.type, day, time_str,
+                s.faculty, s.duration, s.batch, slot, s.room, s.basket))
+        return schedule
+
+
+def optimize_schedule(schedule, slot_master, max_iterations=20000, time_limit=2.0, seed=0, weights=None,
+                      faculty_unavailable=None, grid=None):
+    """Run the local-search post-pass; returns (improved schedule, report)"""
+    optimizer = ScheduleOptimizer(schedule, slot_master, weights=weights, seed=seed,
+                                  faculty_unavailable=faculty_unavailable, grid=grid)
+    return optimizer.optimize(max_iterations=max_iterations, time_limit=time_limit)
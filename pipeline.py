@@ -0,0 +1,163 @@
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from timegrid import grid_for
+import metrics
+
+# pandas and the scheduling stack are imported inside the functions that use them, so importing
+# the web app (and starting a worker) stays fast; app.warmup() loads them ahead of the first request
+
+BASE_DIR = Path(__file__).resolve().parent
+SLOT_MASTER_PATH = BASE_DIR / 'data' / 'slot_master.xlsx'
+
+# slot master is read once per file version and shared by every request / worker
+_slot_master_cache = {}
+_slot_master_lock = threading.Lock()
+
+
+def load_slot_master(path=SLOT_MASTER_PATH):
+    """Return the Slots sheet, re-reading the workbook only when it changes on disk"""
+    path = Path(path)
+    mtime = path.stat().st_mtime
+    with _slot_master_lock:
+        cached = _slot_master_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            metrics.CACHE_REQUESTS.inc(cache='slot_master', result='miss')
+            import pandas as pd
+            cached = (mtime, pd.read_excel(path, sheet_name='Slots'))
+            _slot_master_cache[path] = cached
+        else:
+            metrics.CACHE_REQUESTS.inc(cache='slot_master', result='hit')
+    return cached[1].copy()
+
+
+_grid_cache = {}
+
+# worker processes for component decomposition; 0 schedules in a single pass
+DECOMPOSE_WORKERS = int(os.environ.get('TIMETABLE_DECOMPOSE_WORKERS', '0'))
+
+
+def load_time_grid(path=SLOT_MASTER_PATH):
+    """TimeGrid of a slot master, rebuilt only when the workbook changes"""
+    path = Path(path)
+    mtime = path.stat().st_mtime
+    with _slot_master_lock:
+        cached = _grid_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, grid_for(load_slot_master(path)))
+        with _slot_master_lock:
+            _grid_cache[path] = cached
+    return cached[1]
+
+
+@contextmanager
+def phase(name, profiler=None):
+    """Time a pipeline phase for /metrics and, if a ProfileRun is given, profile it"""
+    with metrics.PHASE_LATENCY.time(phase=name):
+        if profiler is None:
+            yield
+        else:
+            with profiler.phase(name):
+                yield
+
+
+def schedule_courses(courses, slot_master_path=SLOT_MASTER_PATH, profiler=None, optimize_seconds=0,
+                     previous=None, decompose_workers=None):
+    """Schedule an already loaded course table; returns (schedule, stats).
+
+    optimize_seconds > 0 runs the local-search post-pass for at most that long.
+    previous (sessions from load_previous_schedule) pins unchanged courses to their old slots.
+    decompose_workers > 0 solves independent course components in that many processes
+    (default TIMETABLE_DECOMPOSE_WORKERS); warm starts always run in a single pass.
+    """
+    from scheduler import TimetableScheduler
+    from decompose import schedule_decomposed
+    from optimizer import optimize_schedule
+
+    if not Path(slot_master_path).exists():
+        raise FileNotFoundError("Slot master file not found.")
+    slot_master = load_slot_master(slot_master_path)
+    grid = load_time_grid(slot_master_path)
+    workers = DECOMPOSE_WORKERS if decompose_workers is None else decompose_workers
+    with phase('schedule', profiler):
+        if workers > 0 and not previous:
+            scheduler = schedule_decomposed(courses, slot_master, workers=workers, grid=grid)
+            schedule = scheduler.schedule
+        else:
+            scheduler = TimetableScheduler(courses, slot_master, grid=grid, previous=previous)
+            schedule = scheduler.generate_schedule()
+    stats = scheduler.get_stats()
+    stats['warnings'] = scheduler.availability_warnings
+
+    if optimize_seconds > 0:
+        with phase('optimize', profiler):
+            schedule, stats['optimizer'] = optimize_schedule(schedule, slot_master, time_limit=optimize_seconds,
+                                                             faculty_unavailable=scheduler.faculty_unavailable,
+                                                             grid=grid)
+
+    metrics.RUN_COURSES.observe(stats['courses'])
+    metrics.RUN_SESSIONS.observe(stats['sessions'])
+    metrics.RUN_UNPLACED_HOURS.observe(stats['unplaced_hours'])
+    return schedule, stats
+
+
+def run_generate(file_stream, slot_master_path=SLOT_MASTER_PATH, progress=None, profiler=None, optimize_seconds=0,
+                 previous_stream=None, render_html=True):
+    """Load courses, schedule them and render the batch previews.
+
+    progress is an optional callback(stage, percent) used by background jobs,
+    profiler an optional profiling.ProfileRun, previous_stream an optional
+    earlier Excel export to warm-start from. With render_html=False the
+    browser draws the preview (static/timetable.js) and batch_htmls is None.
+    Returns (schedule, batch_htmls).
+    """
+    from data_loader import load_courses_from_minimal_format as load_courses, load_previous_schedule
+    from visualizer import generate_html_per_batch
+
+    def report(stage, percent):
+        if progress is not None:
+            progress(stage, percent)
+
+    report('loading', 10)
+    with phase('load', profiler):
+        courses = load_courses(file_stream)
+        previous = load_previous_schedule(previous_stream) if previous_stream is not None else None
+
+    report('scheduling', 40)
+    schedule, _ = schedule_courses(courses, slot_master_path, profiler, optimize_seconds, previous)
+
+    batch_htmls = None
+    if render_html:
+        report('rendering', 80)
+        with phase('render', profiler):
+            batch_htmls = generate_html_per_batch(schedule, load_time_grid(slot_master_path))
+
+    report('done', 100)
+    return schedule, batch_htmls
+
+
+def run_alternatives(file_stream, slot_master_path=SLOT_MASTER_PATH, k=4, optimize_seconds=0,
+                     previous_stream=None):
+    """Load courses once and build k ranked alternative timetables with batch previews.
+
+    previous_stream (an earlier export) pins unchanged courses in every alternative.
+    """
+    from alternatives import generate_alternatives
+    from data_loader import load_courses_from_minimal_format as load_courses, load_previous_schedule
+    from visualizer import generate_html_per_batch
+
+    with phase('load'):
+        courses = load_courses(file_stream)
+        previous = load_previous_schedule(previous_stream) if previous_stream is not None else None
+    if not Path(slot_master_path).exists():
+        raise FileNotFoundError("Slot master file not found.")
+    with phase('schedule'):
+        alternatives = generate_alternatives(courses, load_slot_master(slot_master_path), k=k,
+                                             optimize_seconds=optimize_seconds, previous=previous)
+    grid = load_time_grid(slot_master_path)
+    with phase('render'):
+        for alternative in alternatives:
+            alternative['batch_htmls'] = generate_html_per_batch(alternative['schedule'], grid)
+    return alternatives
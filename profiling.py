@@ -0,0 +1,109 @@
+"""Opt-in profiling of generation runs.
+
+A ProfileRun records one cProfile file and a tracemalloc peak per phase
+(load, schedule, render) under profiles/<id>/. The .prof files are standard
+pstats dumps (python -m pstats, snakeviz, ...); summary.json has the wall
+times, peak memory and top allocation sites per phase. With keep and/or ttl
+set, each new run first removes the profiles beyond the keep newest and
+those older than ttl seconds.
+"""
+import cProfile
+import json
+import re
+import shutil
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+PROFILE_DIR = BASE_DIR / 'profiles'
+
+# tracemalloc is process wide, so profiled runs take turns
+_run_lock = threading.Lock()
+_SAFE_ID = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]*$')
+
+
+class ProfileRun:
+    def __init__(self, profile_id=None, directory=PROFILE_DIR, top_allocations=10, keep=None, ttl=None):
+        self.id = profile_id or uuid.uuid4().hex[:12]
+        self.directory = Path(directory) / self.id
+        self.top_allocations = top_allocations
+        self.keep = keep
+        self.ttl = ttl
+        self.phases = {}
+
+    def __enter__(self):
+        _run_lock.acquire()
+        prune_profiles(self.directory.parent, self.keep and self.keep - 1, self.ttl)  # room for this run
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if self._started_tracing:
+                tracemalloc.stop()
+            self.save_summary()
+        finally:
+            _run_lock.release()
+        return False
+
+    @contextmanager
+    def phase(self, name):
+        """Profile one phase; writes <name>.prof and records its peak memory"""
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            profiler.dump_stats(str(self.directory / f'{name}.prof'))
+            top = tracemalloc.take_snapshot().statistics('lineno')[:self.top_allocations]
+            self.phases[name] = {
+                'seconds': elapsed,
+                'peak_memory_bytes': peak - base,
+                'top_allocations': [{'site': str(stat.traceback), 'size_bytes': stat.size, 'count': stat.count}
+                                    for stat in top],
+                'profile_file': f'{name}.prof'
+            }
+
+    def save_summary(self):
+        summary = {'profile_id': self.id, 'phases': self.phases}
+        (self.directory / 'summary.json').write_text(json.dumps(summary, indent=2))
+        return summary
+
+
+def prune_profiles(directory=PROFILE_DIR, keep=None, ttl=None):
+    """Remove stored profiles older than ttl seconds, then all but the keep newest; returns how many went"""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return 0
+    runs = sorted((path.stat().st_mtime, path) for path in directory.iterdir() if path.is_dir())
+    cutoff = time.time() - ttl if ttl is not None else None
+    drop = [path for used, path in runs if cutoff is not None and used < cutoff]
+    kept = [path for _, path in runs if path not in drop]
+    if keep is not None and len(kept) > keep:
+        drop += kept[:len(kept) - keep]
+    for path in drop:
+        shutil.rmtree(path, ignore_errors=True)
+    return len(drop)
+
+
+def profile_path(profile_id, filename=None, directory=PROFILE_DIR):
+    """Resolve a stored profile (or one of its files), rejecting anything outside the profile dir"""
+    if not _SAFE_ID.match(profile_id) or (filename is not None and not _SAFE_ID.match(filename)):
+        return None
+    path = Path(directory) / profile_id
+    if filename is not None:
+        path = path / filename
+    return path if path.exists() else None
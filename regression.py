@@ -0,0 +1,209 @@
+"""Golden-output and performance regression checks for the scheduling pipeline.
+
+    python regression.py                    # compare with data/golden/
+    python regression.py --invariants-only  # placements are expected to change
+    python regression.py --update           # re-record goldens and baselines
+
+Every case runs the full pipeline (load, schedule, preview, Excel export)
+on data/newinput1.xlsx or a synthetic workbook. A case fails when:
+  - its sessions differ from the stored golden (skipped with --invariants-only)
+  - an invariant breaks: a slot code used twice (outside an elective
+    basket), a course given more hours than its L-T-P, a session off the
+    time grid, more clashes or more unplaced hours than the golden recorded
+  - the best-of-N wall time or the peak traced memory exceeds the recorded
+    baseline by more than the tolerance (and the absolute slack)
+Baselines are machine specific; re-record them with --update on the
+machine that runs the checks.
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from io import BytesIO
+from pathlib import Path
+
+from conflicts import find_conflicts
+from data_loader import load_courses_from_minimal_format as load_courses
+from loadtest import make_workbook
+from pipeline import BASE_DIR, SLOT_MASTER_PATH, load_time_grid, schedule_courses
+from visualizer import generate_excel_bytes, generate_html_per_batch
+
+GOLDEN_DIR = BASE_DIR / 'data' / 'golden'
+BASELINES_NAME = 'baselines.json'
+# small runs are noisy; a check only fails when it is also over by this much in absolute terms
+TIME_SLACK_S = 0.1
+MEMORY_SLACK_MB = 0.5
+
+# name -> workbook path, or (courses, batches, seed) for a loadtest.make_workbook input
+CASES = {
+    'newinput1': BASE_DIR / 'data' / 'newinput1.xlsx',
+    'synthetic-40': (40, 4, 0),
+    'synthetic-120': (120, 6, 1),
+    'synthetic-300': (300, 10, 2),
+}
+
+
+def case_workbook(spec):
+    if isinstance(spec, Path):
+        return spec.read_bytes()
+    return make_workbook(*spec[:2], seed=spec[2])
+
+
+def run_pipeline(workbook, slot_master_path=SLOT_MASTER_PATH):
+    courses = load_courses(BytesIO(workbook))
+    schedule, stats = schedule_courses(courses, slot_master_path)
+    grid = load_time_grid(slot_master_path)
+    generate_html_per_batch(schedule, grid)
+    generate_excel_bytes(schedule, grid)
+    return courses, schedule, stats
+
+
+def measure(workbook, repeat):
+    """Best-of-repeat wall time, then one traced run for peak memory"""
+    run_pipeline(workbook)  # warm the slot master cache and imports
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run_pipeline(workbook)
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run_pipeline(workbook)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, best, peak / 2 ** 20
+
+
+def fingerprint(schedule):
+    """Order-independent, JSON friendly form of every placed session"""
+    return sorted([code, s.batch, s.day, s.time, s.faculty, s.slot, s.duration]
+                  for code, sessions in schedule.items() for s in sessions)
+
+
+def golden_record(schedule, stats):
+    return {
+        'stats': {k: stats[k] for k in ('courses', 'sessions', 'required_hours', 'scheduled_hours',
+                                        'unplaced_hours')},
+        'conflicts': len(find_conflicts(schedule)),
+        'sessions': fingerprint(schedule),
+    }
+
+
+def check_invariants(courses, schedule, stats, golden):
+    """Problems that must never appear, whatever the placements"""
+    problems = []
+    grid = load_time_grid()
+    # the courses of an elective basket share their slot and count as one use
+    users = {(s.slot, s.basket, s.batch) if s.basket else (s.slot, id(s))
+             for sessions in schedule.values() for s in sessions if s.slot}
+    slots = Counter(user[0] for user in users)
+    problems += [f"slot {code} used {n} times" for code, n in slots.items() if n > 1]
+
+    required = defaultdict(int)
+    for code, batch, ltp in zip(courses['SubjectCode'], courses['BatchYear'], courses['L-T-P']):
+        required[(code, batch)] += sum(int(x) for x in str(ltp).split('-'))
+    placed = defaultdict(int)
+    for sessions in schedule.values():
+        for s in sessions:
+            placed[(s.course_code, s.batch)] += s.duration
+            if s.day not in grid.day_index or grid.cell(s.start) is None:
+                problems.append(f"{s.course_code} at {s.day} {s.time} is off the time grid")
+    problems += [f"{code} ({batch}) got {hours}h for {required[(code, batch)]}h of L-T-P"
+                 for (code, batch), hours in placed.items() if hours > required[(code, batch)]]
+
+    if golden:
+        clashes = len(find_conflicts(schedule))
+        if clashes > golden['conflicts']:
+            problems.append(f"{clashes} clashes (golden had {golden['conflicts']})")
+        if stats['unplaced_hours'] > golden['stats']['unplaced_hours']:
+            problems.append(f"{stats['unplaced_hours']} unplaced hours "
+                            f"(golden had {golden['stats']['unplaced_hours']})")
+    return problems
+
+
+def compare_golden(schedule, golden):
+    current = {tuple(s) for s in fingerprint(schedule)}
+    expected = {tuple(s) for s in golden['sessions']}
+    if current == expected:
+        return []
+    return [f"{len(expected - current)} golden sessions missing, {len(current - expected)} new sessions"]
+
+
+def run(names, repeat=3, time_tolerance=0.5, memory_tolerance=0.25, invariants_only=False, update=False,
+        golden_dir=GOLDEN_DIR):
+    golden_dir = Path(golden_dir)
+    baselines_path = golden_dir / BASELINES_NAME
+    baselines = json.loads(baselines_path.read_text()) if baselines_path.exists() else {}
+    run_pipeline(case_workbook(CASES['newinput1']))  # first-run imports and caches stay out of the numbers
+    rows = []
+    for name in names:
+        (courses, schedule, stats), seconds, peak_mb = measure(case_workbook(CASES[name]), repeat)
+        golden_path = golden_dir / f'{name}.json'
+        row = {'case': name, 'seconds': seconds, 'peak_mb': peak_mb, 'problems': []}
+
+        if update:
+            golden_dir.mkdir(parents=True, exist_ok=True)
+            golden_path.write_text(json.dumps(golden_record(schedule, stats), indent=1))
+            baselines[name] = {'seconds': seconds, 'peak_mb': peak_mb}
+            row['problems'] += check_invariants(courses, schedule, stats, None)
+            rows.append(row)
+            continue
+
+        golden = json.loads(golden_path.read_text()) if golden_path.exists() else None
+        if golden is None:
+            row['problems'].append("no golden output (run with --update)")
+        elif not invariants_only:
+            row['problems'] += compare_golden(schedule, golden)
+        row['problems'] += check_invariants(courses, schedule, stats, golden)
+
+        baseline = baselines.get(name)
+        if baseline:
+            row['baseline_seconds'] = baseline['seconds']
+            row['baseline_mb'] = baseline['peak_mb']
+            if seconds > max(baseline['seconds'] * (1 + time_tolerance), baseline['seconds'] + TIME_SLACK_S):
+                row['problems'].append(f"{seconds:.3f}s vs baseline {baseline['seconds']:.3f}s")
+            if peak_mb > max(baseline['peak_mb'] * (1 + memory_tolerance), baseline['peak_mb'] + MEMORY_SLACK_MB):
+                row['problems'].append(f"{peak_mb:.1f} MB vs baseline {baseline['peak_mb']:.1f} MB")
+        rows.append(row)
+
+    if update:
+        baselines_path.write_text(json.dumps(baselines, indent=2, sort_keys=True))
+    return rows
+
+
+def print_report(rows):
+    print(f"{'case':16} {'time s':>8} {'base s':>8} {'peak MB':>8} {'base MB':>8}  result")
+    for row in rows:
+        base_s = f"{row['baseline_seconds']:8.3f}" if 'baseline_seconds' in row else ' ' * 8
+        base_mb = f"{row['baseline_mb']:8.1f}" if 'baseline_mb' in row else ' ' * 8
+        print(f"{row['case']:16} {row['seconds']:8.3f} {base_s} {row['peak_mb']:8.1f} {base_mb}  "
+              f"{'ok' if not row['problems'] else 'FAIL'}")
+        for problem in row['problems']:
+            print(f"    - {problem}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Golden-output and performance regression checks")
+    parser.add_argument('cases', nargs='*', choices=[[], *CASES], metavar='case',
+                        help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument('--invariants-only', action='store_true',
+                        help="skip the exact golden comparison (for intended placement changes)")
+    parser.add_argument('--update', action='store_true', help="re-record goldens and baselines")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per case; the best one counts")
+    parser.add_argument('--time-tolerance', type=float, default=0.5, help="allowed slowdown (0.5 = +50%%)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help="allowed peak memory growth")
+    args = parser.parse_args(argv)
+
+    rows = run(args.cases or list(CASES), args.repeat, args.time_tolerance, args.memory_tolerance,
+               args.invariants_only, args.update)
+    print_report(rows)
+    return 1 if any(row['problems'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
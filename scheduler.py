@@ -1,9 +1,32 @@
 import pandas as pd
 from collections import defaultdict
 import datetime
+import random
+import re
+
+from session_record import SessionRecord, format_slot_time, parse_time_range, time_to_minutes
+from timegrid import grid_for
+
+# separators between UnavailableSlots entries; commas inside slot codes like A3(1,2) are kept
+_TOKEN_SPLIT = re.compile(r'[;,](?![^()]*\))')
+
+# How much each factor adds to a course's priority (higher = scheduled earlier):
+#   lab_block    the course needs a 3-hour lab block (few of those exist)
+#   scarcity     hours needed / grid cells still free for its faculty and batch
+#   faculty_load hours its faculty still has to place
+#   batch_load   hours its batch still has to place
+PRIORITY_WEIGHTS = {'lab_block': 100.0, 'scarcity': 50.0, 'faculty_load': 0.5, 'batch_load': 0.25}
+
+
+def _text(value):
+    """Optional text cell (RoomPref, Basket) -> stripped string ('' when blank)"""
+    if value is None or pd.isna(value):
+        return ''
+    return str(value).strip()
+
 
 class TimetableScheduler:
-    def __init__(self, courses, slot_master):
+    def __init__(self, courses, slot_master, seed=None, grid=None, ordering='priority', previous=None):
         self.courses = courses
         self.slots = slot_master
         self.schedule = defaultdict(list)
@@ -12,19 +35,133 @@ class TimetableScheduler:
             'batch_days': defaultdict(set),
             'subject_day': defaultdict(lambda: defaultdict(bool))
         }
+        # seed=None keeps the spreadsheet / weekday order; a seed shuffles course order,
+        # day order and ties between slot groups to produce an alternative timetable
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.grid = grid or grid_for(slot_master)  # days and cell bitmaps
+        self.days = list(self.grid.days)
+        if seed is not None:
+            self.random.shuffle(self.days)
+        # 'priority' schedules the most constrained course next; 'input' keeps sheet order (labs first)
+        self.ordering = ordering
+        # warm start: sessions of an earlier timetable (data_loader.load_previous_schedule)
+        self.previous = previous or []
+        self.pinned = set()  # (SubjectCode, BatchYear) kept from the previous timetable
+        self.fallback_courses = set()  # (SubjectCode, BatchYear) no slot group fitted, placed session by session
         self.slot_groups = defaultdict(list)
+        self.slot_masks = {}
+        # placed sessions indexed by (faculty, day) / (batch, day) so clash checks skip everyone else
+        self.faculty_day_sessions = defaultdict(list)
+        self.batch_day_sessions = defaultdict(list)
+        self.faculty_busy = defaultdict(int)  # cells already taken, as grid bitmaps
+        self.batch_busy = defaultdict(int)
+        self._free_cells = None
         self._build_slot_groups()
+        self._compile_faculty_availability()
+        self._build_baskets()
     
     def _build_slot_groups(self):
         """Group slots by their group code"""
         for _, slot in self.slots.iterrows():
             group_code = slot['SlotCode'].split('(')[0].strip()
             self.slot_groups[group_code].append(slot.to_dict())
+            self.slot_masks[slot['SlotCode']] = self.grid.mask(
+                slot['Day'], time_to_minutes(slot['StartTime']), time_to_minutes(slot['EndTime']))
         
         # Sort each group by day and start time
         for group in self.slot_groups.values():
-            group.sort(key=lambda x: (x['Day'], x['StartTime']))
+            group.sort(key=lambda x: self.grid.sort_key(x['Day'], time_to_minutes(x['StartTime'])))
     
+    def _compile_faculty_availability(self):
+        """Compile UnavailableSlots / MaxHours into per-faculty bitmaps and caps, once per run"""
+        self.faculty_unavailable = defaultdict(int)
+        self.faculty_max_hours = {}
+        self.faculty_hours = defaultdict(int)
+        self.availability_warnings = []
+        seen = set()
+        for _, course in self.courses.iterrows():
+            faculty = course['Faculty1']
+            entries = str(course.get('UnavailableSlots', '') or '')
+            # the same faculty row is repeated on every course they teach
+            if (faculty, entries) in seen:
+                continue
+            seen.add((faculty, entries))
+            for token in _TOKEN_SPLIT.split(entries):
+                token = token.strip()
+                if token and token.lower() != 'nan':
+                    self.faculty_unavailable[faculty] |= self._unavailability_mask(faculty, token)
+            max_hours = course.get('MaxHours')
+            if max_hours is not None and not pd.isna(max_hours):
+                self.faculty_max_hours[faculty] = min(self.faculty_max_hours.get(faculty, max_hours), max_hours)
+
+    def _unavailability_mask(self, faculty, token):
+        """Mask for one entry: a slot code (A3(1)), a slot group (A3), a day, or 'Day HH:MM-HH:MM'"""
+        if token in self.slot_masks:
+            return self.slot_masks[token]
+        if token in self.slot_groups:
+            mask = 0
+            for slot in self.slot_groups[token]:
+                mask |= self.slot_masks[slot['SlotCode']]
+            return mask
+
+        parts = token.split(None, 1)
+        day = self.grid.match_day(parts[0])
+        if day is not None:
+            if len(parts) == 1:
+                return self.grid.day_mask(day)
+            try:
+                start, end = (time_to_minutes(t) for t in parts[1].replace(' ', '').split('-'))
+                return self.grid.mask(day, start, end)
+            except ValueError:
+                pass
+        self.availability_warnings.append(f"Unrecognized unavailable slot '{token}' for {faculty}")
+        return 0
+
+    def _build_baskets(self):
+        """Group elective courses by (Basket, BatchYear); members run in the same slots.
+
+        A basket only needs distinct faculty and rooms, since each student of the
+        batch attends one of its courses. Lab courses and members that would share
+        a faculty or room with an earlier member are scheduled on their own.
+        """
+        self.baskets = {}    # (basket, batch) -> member course rows; the first one places the basket
+        self.basket_of = {}  # (SubjectCode, BatchYear) -> (basket, batch)
+        if 'Basket' not in self.courses.columns:
+            return
+        members = defaultdict(list)
+        for _, course in self.courses.iterrows():
+            basket = _text(course['Basket'])
+            if not basket:
+                continue
+            key = (basket, course['BatchYear'])
+            if str(course['Type']).lower() == 'lab':
+                self.availability_warnings.append(
+                    f"Basket {basket} ({course['BatchYear']}): lab course {course['SubjectCode']} is scheduled on its own")
+                continue
+            taken = members[key]
+            room = _text(course.get('RoomPref'))
+            if any(m['Faculty1'] == course['Faculty1'] or (room and _text(m.get('RoomPref')) == room) for m in taken):
+                self.availability_warnings.append(
+                    f"Basket {basket} ({course['BatchYear']}): {course['SubjectCode']} shares a faculty or room "
+                    f"with another elective and is scheduled on its own")
+                continue
+            taken.append(course)
+        for key, courses in members.items():
+            if len(courses) > 1:
+                self.baskets[key] = courses
+                for course in courses:
+                    self.basket_of[(course['SubjectCode'], course['BatchYear'])] = key
+
+    def _basket_name(self, course):
+        key = self.basket_of.get((course['SubjectCode'], course['BatchYear']))
+        return key[0] if key else ''
+
+    def _basket_follower(self, course):
+        """True for basket members other than the first, which places the whole basket"""
+        key = self.basket_of.get((course['SubjectCode'], course['BatchYear']))
+        return key is not None and self.baskets[key][0]['SubjectCode'] != course['SubjectCode']
+
     def parse_ltp(self, ltp_str):
         """Parse L-T-P string into (lecture, tutorial, practical)"""
         try:
@@ -35,46 +172,34 @@ class TimetableScheduler:
         except:
             return 0, 0, 0
     
-    def _compare_times(self, time1, time2):
-        """Compare two time objects that could be strings or datetime.time"""
-        if isinstance(time1, str):
-            time1 = pd.to_datetime(time1).time()
-        if isinstance(time2, str):
-            time2 = pd.to_datetime(time2).time()
-        return time1, time2
-    
-    def _has_conflict(self, course, day, slot):
+    def _has_conflict(self, course, day, slot, duration=None):
+        """Whether a session of course in slot clashes; duration is the hours it would book (default the slot's)"""
         faculty = course['Faculty1']
         batch = course['BatchYear']
         subject_code = course['SubjectCode']
         
-        # Get slot times properly
-        slot_start, slot_end = self._compare_times(slot['StartTime'], slot['EndTime'])
-        
-        # Check faculty availability
-        if faculty in self.constraints['faculty_days'][day]:
-            for scheduled in self.schedule.values():
-                for session in scheduled:
-                    if session['faculty'] == faculty and session['day'] == day:
-                        sess_start, sess_end = self._compare_times(
-                            session['time'].split(' - ')[0],
-                            session['time'].split(' - ')[1]
-                        )
-                        if max(slot_start, sess_start) < min(slot_end, sess_end):
-                            return True
-        
+        # Faculty unavailability and weekly cap: one mask test against the compiled bitmap
+        if self.slot_masks.get(slot['SlotCode'], 0) & self.faculty_unavailable.get(faculty, 0):
+            return True
+        max_hours = self.faculty_max_hours.get(faculty)
+        if duration is None:
+            duration = slot['Duration']
+        if max_hours is not None and self.faculty_hours[faculty] + duration > max_hours:
+            return True
+
+        # Slot times as minutes, compared against the minutes kept on each placed session
+        slot_start = time_to_minutes(slot['StartTime'])
+        slot_end = time_to_minutes(slot['EndTime'])
         
+        # Check faculty availability (only that faculty's sessions on that day)
+        for session in self.faculty_day_sessions.get((faculty, day), ()):
+            if max(slot_start, session.start) < min(slot_end, session.end):
+                return True
+
         # Check batch conflicts
-        if batch in self.constraints['batch_days'][day]:
-            for scheduled in self.schedule.values():
-                for session in scheduled:
-                    if session['batch'] == batch and session['day'] == day:
-                        sess_start, sess_end = self._compare_times(
-                            session['time'].split(' - ')[0],
-                            session['time'].split(' - ')[1]
-                        )
-                        if max(slot_start, sess_start) < min(slot_end, sess_end):
-                            return True
+        for session in self.batch_day_sessions.get((batch, day), ()):
+            if max(slot_start, session.start) < min(slot_end, session.end):
+                return True
         
         # Check subject daily limit
         if self.constraints['subject_day'][subject_code].get(day, False):
@@ -82,8 +207,8 @@ class TimetableScheduler:
         
         return False
     
-    def _place_session(self, course, day, slot, session_type, duration):
-        """Place a session and update constraints"""
+    def _place_session(self, course, day, slot, session_type, duration, drop_slot=True):
+        """Place a session and update constraints (drop_slot=False leaves removing the slot to the caller)"""
         subject_code = course['SubjectCode']
         faculty = course['Faculty1']
         batch = course['BatchYear']
@@ -92,28 +217,38 @@ class TimetableScheduler:
         actual_type = 'Tutorial' if session_type == 'Theory' and t > 0 else 'Lecture'
 
         # Format time string consistently
-        start_time = slot['StartTime'] if isinstance(slot['StartTime'], str) else slot['StartTime'].strftime('%H:%M:%S')
-        end_time = slot['EndTime'] if isinstance(slot['EndTime'], str) else slot['EndTime'].strftime('%H:%M:%S')
+        start_time = format_slot_time(slot['StartTime'])
+        end_time = format_slot_time(slot['EndTime'])
         
-        entry = {
-            'course_code': subject_code,
-            'course_name': course['SubjectName'],
-            'type': actual_type.lower(),
-            'day': day,
-            'time': f"{start_time} - {end_time}",
-            'faculty': faculty,
-            'duration': duration,
-            'batch': batch
-        }
+        entry = SessionRecord(
+            course_code=subject_code,
+            course_name=course['SubjectName'],
+            type=actual_type.lower(),
+            day=day,
+            time=f"{start_time} - {end_time}",
+            faculty=faculty,
+            duration=duration,
+            batch=batch,
+            slot=slot['SlotCode'],
+            room=_text(course.get('RoomPref')),
+            basket=self._basket_name(course)
+        )
         self.schedule[subject_code].append(entry)
+        self.faculty_day_sessions[(faculty, day)].append(entry)
+        self.batch_day_sessions[(batch, day)].append(entry)
         
         # Update constraints
         self.constraints['faculty_days'][day].add(faculty)
         self.constraints['batch_days'][day].add(batch)
         self.constraints['subject_day'][subject_code][day] = True
+        self.faculty_hours[faculty] += duration
+        self.faculty_busy[faculty] |= self.slot_masks.get(slot['SlotCode'], 0)
+        self.batch_busy[batch] |= self.slot_masks.get(slot['SlotCode'], 0)
         
         # Remove the slot from available slots
-        self.slots = self.slots[self.slots['SlotCode'] != slot['SlotCode']]
+        if drop_slot:
+            self.slots = self.slots[self.slots['SlotCode'] != slot['SlotCode']]
+        self._free_cells = None
     
     def _assign_sessions(self, course, session_type, count, duration):
         """Assign individual sessions (fallback method)"""
@@ -125,7 +260,7 @@ class TimetableScheduler:
             assigned = False
             
             # Try all days in order
-            for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']:
+            for day in self.days:
                 # Find available slots matching our requirements
                 available = self.slots[
                     (self.slots['Day'] == day) &
@@ -163,22 +298,32 @@ class TimetableScheduler:
         if len(available_slots) != len(group_slots):
             return False
         
+        # A group places all its hours at once, so check the weekly cap for the whole block
+        max_hours = self.faculty_max_hours.get(course['Faculty1'])
+        if max_hours is not None and self.faculty_hours[course['Faculty1']] + total_hours > max_hours:
+            return False
+
         # Check for conflicts
-        for slot in group_slots:
-            if self._has_conflict(course, slot['Day'], slot):
+        durations = self._group_durations(group_slots, total_hours)
+        for slot, duration in zip(group_slots, durations):
+            if self._has_conflict(course, slot['Day'], slot, duration):
                 return False
         
         # Assign sessions without distinguishing between lecture/tutorial
-        hours_assigned = 0
-        for slot in group_slots:
-            session_duration = min(slot['Duration'], total_hours - hours_assigned)
-            self._place_session(course, slot['Day'], slot, 'Theory', session_duration)
-            hours_assigned += session_duration
-            
-            if hours_assigned >= total_hours:
-                break
+        for slot, duration in zip(group_slots, durations):
+            if duration:
+                self._place_session(course, slot['Day'], slot, 'Theory', duration)
         
-        return hours_assigned == total_hours
+        return sum(durations) == total_hours
+
+    @staticmethod
+    def _group_durations(group_slots, hours):
+        """Hours booked in each slot of a group when it places hours in slot order (0 once they are all placed)"""
+        durations = []
+        for slot in group_slots:
+            durations.append(min(slot['Duration'], hours))
+            hours -= durations[-1]
+        return durations
     
     def _assign_lab_course(self, course):
         """Assign a lab course: 3-hour lab and then the theory part"""
@@ -187,7 +332,7 @@ class TimetableScheduler:
         
         # First assign the lab (3-hour block)
         lab_assigned = False
-        for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']:
+        for day in self.days:
             available = self.slots[
                 (self.slots['Day'] == day) &
                 (self.slots['Duration'] == 3) &
@@ -212,6 +357,7 @@ class TimetableScheduler:
                     group_candidates.append((group_code, total_duration))
             
             # Sort by closest match to total hours needed
+            self._shuffle(group_candidates)
             group_candidates.sort(key=lambda x: abs(x[1] - total_theory))
             
             for group_code, _ in group_candidates:
@@ -219,6 +365,7 @@ class TimetableScheduler:
                     return True
             
             # Fallback to individual assignment
+            self.fallback_courses.add((course['SubjectCode'], course['BatchYear']))
             remaining = total_theory
             while remaining > 0:
                 duration = 2 if remaining >= 2 else 1
@@ -240,6 +387,7 @@ class TimetableScheduler:
                 group_candidates.append((group_code, total_duration))
         
         # Sort by closest match to total hours needed
+        self._shuffle(group_candidates)
         group_candidates.sort(key=lambda x: abs(x[1] - total_hours))
         
         for group_code, _ in group_candidates:
@@ -247,6 +395,7 @@ class TimetableScheduler:
                 return True
         
         # Fallback to individual assignment
+        self.fallback_courses.add((course['SubjectCode'], course['BatchYear']))
         remaining = total_hours
         while remaining > 0:
             duration = 2 if remaining >= 2 else 1
@@ -256,15 +405,285 @@ class TimetableScheduler:
         return True
     
     
+    def _assign_basket(self, members):
+        """Place an elective basket: every member in the same slots, each up to its own L+T hours"""
+        hours = [sum(self.parse_ltp(course['L-T-P'])[:2]) for course in members]
+        total_hours = max(hours)
+
+        group_candidates = []
+        for group_code, slots in self.slot_groups.items():
+            if any(slot['SlotType'] != 'Theory' for slot in slots):
+                continue  # electives are L+T: lab blocks stay free for lab courses
+            total_duration = sum(slot['Duration'] for slot in slots)
+            if total_duration >= total_hours:
+                group_candidates.append((group_code, total_duration))
+        self._shuffle(group_candidates)
+        group_candidates.sort(key=lambda x: abs(x[1] - total_hours))
+        for group_code, _ in group_candidates:
+            if self._assign_basket_group(members, hours, group_code):
+                return True
+
+        # Fallback: one shared slot at a time, each taken by the members that still need hours
+        self.fallback_courses.update((course['SubjectCode'], course['BatchYear']) for course in members)
+        remaining = list(hours)
+        while max(remaining) > 0:
+            duration = 2 if max(remaining) >= 2 else 1
+            slot = self._find_basket_slot(members, remaining, duration)
+            if slot is None and duration > 1:
+                duration = 1
+                slot = self._find_basket_slot(members, remaining, duration)
+            if slot is None:
+                return False
+            for i, course in enumerate(members):
+                if remaining[i] > 0:
+                    session_duration = min(duration, remaining[i])
+                    self._place_session(course, slot['Day'], slot, 'Theory', session_duration)
+                    remaining[i] -= session_duration
+        return True
+
+    def _assign_basket_group(self, members, hours, group_code):
+        """Like _assign_with_group, but the group's slots are shared by every member"""
+        group_slots = self.slot_groups.get(group_code, [])
+        if not group_slots:
+            return False
+        slot_codes = [slot['SlotCode'] for slot in group_slots]
+        if self.slots['SlotCode'].isin(slot_codes).sum() != len(group_slots):
+            return False
+        for course, course_hours in zip(members, hours):
+            max_hours = self.faculty_max_hours.get(course['Faculty1'])
+            if max_hours is not None and self.faculty_hours[course['Faculty1']] + course_hours > max_hours:
+                return False
+            durations = self._group_durations(group_slots, course_hours)
+            if any(self._has_conflict(course, slot['Day'], slot, duration)
+                   for slot, duration in zip(group_slots, durations)):
+                return False
+
+        for course, course_hours in zip(members, hours):
+            for slot, duration in zip(group_slots, self._group_durations(group_slots, course_hours)):
+                if duration:
+                    self._place_session(course, slot['Day'], slot, 'Theory', duration)
+        return True
+
+    def _find_basket_slot(self, members, remaining, duration):
+        """First free theory slot of that duration where no member that still needs hours clashes"""
+        for day in self.days:
+            available = self.slots[
+                (self.slots['Day'] == day) &
+                (self.slots['Duration'] == duration) &
+                (self.slots['SlotType'] == 'Theory')
+            ]
+            for _, slot in available.iterrows():
+                if not any(remaining[i] > 0 and self._has_conflict(course, day, slot, min(duration, remaining[i]))
+                           for i, course in enumerate(members)):
+                    return slot
+        return None
+
+    def _shuffle(self, items):
+        """Shuffle in place when scheduling with a seed (the sort after it is stable, so only ties move)"""
+        if self.seed is not None:
+            self.random.shuffle(items)
+
+    def _ordered(self, courses):
+        if self.seed is None:
+            return courses
+        return courses.sample(frac=1, random_state=self.seed)
+
+    def _assign_course(self, course):
+        if self.slots.empty:
+            return  # every slot code is taken; trying each group and day would only fail slowly
+        basket = self.basket_of.get((course['SubjectCode'], course['BatchYear']))
+        if basket is not None:
+            self._assign_basket(self.baskets[basket])
+        elif str(course['Type']).lower() == 'lab':
+            self._assign_lab_course(course)
+        else:
+            self._assign_theory_course(course)
+
+    def _free_cell_masks(self):
+        """Cells still covered by an unused slot, per SlotType; rebuilt only after a placement"""
+        if self._free_cells is None:
+            self._free_cells = defaultdict(int)
+            for code, slot_type in zip(self.slots['SlotCode'], self.slots['SlotType']):
+                self._free_cells[slot_type] |= self.slot_masks.get(code, 0)
+        return self._free_cells
+
+    def _priority(self, faculty, batch, needs_lab, hours, remaining_faculty, remaining_batch):
+        """How constrained a course is right now; higher goes first"""
+        free = self._free_cell_masks()['Lab' if needs_lab else 'Theory']
+        free &= ~(self.faculty_busy[faculty] | self.batch_busy[batch] | self.faculty_unavailable.get(faculty, 0))
+        w = PRIORITY_WEIGHTS
+        return (w['lab_block'] * needs_lab
+                + w['scarcity'] * hours / (bin(free).count('1') + 1)
+                + w['faculty_load'] * remaining_faculty[faculty]
+                + w['batch_load'] * remaining_batch[batch])
+
+    def _course_hours(self, course):
+        key = self.basket_of.get((course['SubjectCode'], course['BatchYear']))
+        if key is None:
+            return sum(self.parse_ltp(course['L-T-P']))
+        return max(sum(self.parse_ltp(member['L-T-P'])[:2]) for member in self.baskets[key])
+
+    def _schedule_by_priority(self):
+        """Place the most constrained course first.
+
+        Every placement uses up slot cells, so the scarcity of every course not yet
+        placed can rise, not only of those sharing its faculty or batch. All of
+        them are re-scored before each pick; ties go to the earlier (shuffled)
+        sheet position.
+        """
+        # an elective basket is one entry: its first member, needing the basket's longest L+T
+        courses = [course for _, course in self._ordered(self.courses).iterrows()
+                   if not self._is_pinned(course) and not self._basket_follower(course)]
+        # (faculty, batch, needs a lab, hours) read once, the pandas rows are slow to index
+        keys = [(c['Faculty1'], c['BatchYear'], str(c['Type']).lower() == 'lab', self._course_hours(c))
+                for c in courses]
+        remaining_faculty = defaultdict(int)
+        remaining_batch = defaultdict(int)
+        for faculty, batch, _, h in keys:
+            remaining_faculty[faculty] += h
+            remaining_batch[batch] += h
+
+        waiting = list(range(len(courses)))
+        while waiting:
+            best = max(waiting, key=lambda i: (self._priority(*keys[i], remaining_faculty, remaining_batch), -i))
+            waiting.remove(best)
+            self._assign_course(courses[best])
+            faculty, batch, _, h = keys[best]
+            remaining_faculty[faculty] -= h
+            remaining_batch[batch] -= h
+
+    def _pin_previous(self):
+        """Keep the previous timetable's sessions for every course that is unchanged and still fits.
+
+        A course is pinned only as a whole: same faculty, every old session maps
+        to a free slot of the same day and time, the hours add up to its L-T-P
+        and nothing clashes. Everything else is scheduled from scratch, and so
+        are elective baskets, whose members must move together.
+        """
+        by_time = defaultdict(list)  # (day, start, end) -> slots at that time
+        for _, slot in self.slots.iterrows():
+            by_time[(slot['Day'], time_to_minutes(slot['StartTime']), time_to_minutes(slot['EndTime']))].append(slot)
+        previous = defaultdict(list)
+        for session in self.previous:
+            previous[(str(session['course_code']), str(session.get('batch') or ''))].append(session)
+
+        for _, course in self.courses.iterrows():
+            key = (course['SubjectCode'], course['BatchYear'])
+            sessions = previous.get(key)
+            if not sessions or key in self.pinned or key in self.basket_of:
+                continue
+            if any(session.get('faculty') != course['Faculty1'] for session in sessions):
+                continue
+            placements = self._previous_slots(sessions, by_time)
+            if placements is None:
+                continue
+            hours = sum(duration for _, duration in placements)
+            if hours != sum(self.parse_ltp(course['L-T-P'])):
+                continue
+            max_hours = self.faculty_max_hours.get(course['Faculty1'])
+            if max_hours is not None and self.faculty_hours[course['Faculty1']] + hours > max_hours:
+                continue
+            # like a slot group: check every slot before placing any
+            if any(self._has_conflict(course, slot['Day'], slot, duration) for slot, duration in placements):
+                continue
+            for slot, duration in placements:
+                self._place_session(course, slot['Day'], slot, 'Lab' if slot['SlotType'] == 'Lab' else 'Theory',
+                                    duration)
+            self.pinned.add(key)
+
+    def _previous_slots(self, sessions, by_time):
+        """Map old sessions to distinct free slots at the same day and time; None if any is gone"""
+        free = set(self.slots['SlotCode'])
+        placements = []
+        for session in sessions:
+            start, end = parse_time_range(session['time'])
+            # the session's own slot code if it is known and free, else any free slot at that time
+            candidates = by_time.get((session['day'], start, end), [])
+            slot = next((slot for slot in candidates
+                         if slot['SlotCode'] == session.get('slot') and slot['SlotCode'] in free), None)
+            if slot is None:
+                slot = next((slot for slot in candidates if slot['SlotCode'] in free), None)
+            if slot is None:
+                return None
+            free.discard(slot['SlotCode'])
+            placements.append((slot, int(session.get('duration') or slot['Duration'])))
+        return placements
+
+    def adopt_sessions(self, sessions):
+        """Take over sessions solved elsewhere (decompose.py) on their own slot codes, unchecked.
+
+        The caller guarantees they do not clash. A course with any adopted session
+        is treated as pinned, so generate_schedule() only schedules the others.
+        """
+        slots = {slot['SlotCode']: slot for slot in self.slots.to_dict('records')}
+        courses = {(course['SubjectCode'], course['BatchYear']): course for course in self.courses.to_dict('records')}
+        for session in sessions:
+            key = (session.course_code, session.batch)
+            slot = slots[session.slot]
+            self._place_session(courses[key], slot['Day'], slot, 'Lab' if slot['SlotType'] == 'Lab' else 'Theory',
+                                session.duration, drop_slot=False)
+            self.pinned.add(key)
+        # one filter for every adopted slot instead of one per session
+        self.slots = self.slots[~self.slots['SlotCode'].isin({session.slot for session in sessions})]
+
+    def _is_pinned(self, course):
+        return (course['SubjectCode'], course['BatchYear']) in self.pinned
+
     def generate_schedule(self):
+        if self.previous:
+            self._pin_previous()
+
+        if self.ordering == 'priority':
+            self._schedule_by_priority()
+            return self.schedule
+
         # First, process lab courses
         lab_courses = self.courses[self.courses['Type'].str.lower() == 'lab']
-        for _, course in lab_courses.iterrows():
-            self._assign_lab_course(course)
+        for _, course in self._ordered(lab_courses).iterrows():
+            if not self._is_pinned(course):
+                self._assign_lab_course(course)
         
         # Then, non-lab courses
         non_lab_courses = self.courses[self.courses['Type'].str.lower() != 'lab']
-        for _, course in non_lab_courses.iterrows():
-            self._assign_theory_course(course)
+        for _, course in self._ordered(non_lab_courses).iterrows():
+            if not self._is_pinned(course) and not self._basket_follower(course):
+                self._assign_course(course)
         
-        return self.schedule
\ No newline at end of file
+        return self.schedule
+
+    def get_stats(self):
+        """Summarize required vs scheduled hours per course and batch"""
+        required = defaultdict(int)
+        for _, course in self.courses.iterrows():
+            l, t, p = self.parse_ltp(course['L-T-P'])
+            required[(course['SubjectCode'], course['BatchYear'])] += l + t + p
+
+        scheduled = defaultdict(int)
+        session_count = 0
+        for sessions in self.schedule.values():
+            for session in sessions:
+                scheduled[(session.course_code, session.batch)] += session.duration
+                session_count += 1
+
+        unplaced = []
+        for (code, batch), hours in required.items():
+            if scheduled[(code, batch)] < hours:
+                unplaced.append({
+                    'course_code': code,
+                    'batch': batch,
+                    'required_hours': hours,
+                    'scheduled_hours': scheduled[(code, batch)]
+                })
+
+        total_required = sum(required.values())
+        total_scheduled = sum(min(scheduled[key], hours) for key, hours in required.items())
+        return {
+            'courses': len(self.courses),
+            'sessions': session_count,
+            'required_hours': total_required,
+            'scheduled_hours': total_scheduled,
+            'unplaced_hours': total_required - total_scheduled,
+            'pinned_courses': len(self.pinned),
+            'fallback_courses': len(self.fallback_courses),
+            'unplaced': unplaced
+        }
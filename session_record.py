@@ -0,0 +1,176 @@
+import json
+import struct
+import sys
+import zlib
+from collections import defaultdict
+
+
+def time_to_minutes(value):
+    """'HH:MM[:SS]' string or datetime.time -> minutes since midnight"""
+    if isinstance(value, str):
+        parts = value.strip().split(':')
+        return int(parts[0]) * 60 + (int(parts[1][:2]) if len(parts) > 1 else 0)
+    return value.hour * 60 + value.minute
+
+
+def format_slot_time(value):
+    """Slot master StartTime/EndTime (string or datetime.time) -> 'HH:MM:SS'"""
+    return value if isinstance(value, str) else value.strftime('%H:%M:%S')
+
+
+def parse_time_range(time_str):
+    """'08:00:00 - 09:55:00' (or '08:00-09:55') -> (start, end) in minutes"""
+    start, sep, end = time_str.partition(' - ')
+    if not sep:
+        start, sep, end = time_str.partition('-')
+    start = time_to_minutes(start)
+    return start, time_to_minutes(end) if end.strip() else start + 55
+
+
+class SessionRecord:
+    """One placed session.
+
+    Uses __slots__ and interned strings so thousands of sessions share their
+    faculty/batch/course text, and keeps start/end as minutes so conflict
+    checks never re-parse the time string. Supports the read side of the dict
+    interface (session['faculty'], session.get('room')) so templates and the
+    exporter work on records and on plain dicts from the browser alike.
+    """
+    FIELDS = ('course_code', 'course_name', 'type', 'day', 'time', 'faculty', 'duration', 'batch', 'slot', 'room',
+              'basket')
+    __slots__ = FIELDS + ('start', 'end')
+
+    def __init__(self, course_code, course_name, type, day, time, faculty, duration, batch, slot='', room='',
+                 basket=''):
+        intern = sys.intern
+        self.course_code = intern(str(course_code))
+        self.course_name = intern(str(course_name))
+        self.type = intern(str(type))
+        self.day = intern(str(day))
+        self.time = intern(str(time))
+        self.faculty = intern(str(faculty))
+        self.duration = int(duration)
+        self.batch = intern(str(batch))
+        self.slot = intern(str(slot))  # slot master code the session occupies ('' if unknown)
+        self.room = intern(str(room))  # preferred room from the input ('' if none)
+        self.basket = intern(str(basket))  # elective basket; its courses run in parallel for the batch
+        self.start, self.end = parse_time_range(self.time)
+
+    @classmethod
+    def from_dict(cls, data):
+        values = (data.get(field) for field in cls.FIELDS)
+        return cls(*(('' if field != 'duration' else 1) if value is None else value
+                     for field, value in zip(cls.FIELDS, values)))
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def keys(self):
+        return self.FIELDS
+
+    def __eq__(self, other):
+        if not isinstance(other, SessionRecord):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.FIELDS)
+
+    def __repr__(self):
+        return f"SessionRecord({self.course_code!r}, {self.day!r}, {self.time!r}, {self.faculty!r}, {self.batch!r})"
+
+
+def schedule_from_dicts(data):
+    """Schedule as parsed from JSON ({code: [dict, ...]}) -> {code: [SessionRecord, ...]}"""
+    schedule = defaultdict(list)
+    for code, sessions in data.items():
+        schedule[code] = [s if isinstance(s, SessionRecord) else SessionRecord.from_dict(s) for s in sessions]
+    return schedule
+
+
+def schedule_to_dicts(schedule):
+    """Plain dict form for JSON responses"""
+    return {code: [s.to_dict() if isinstance(s, SessionRecord) else dict(s) for s in sessions]
+            for code, sessions in schedule.items()}
+
+
+def schedule_to_json(schedule):
+    return json.dumps(schedule_to_dicts(schedule))
+
+
+# Binary layout (zlib compressed):
+#   header   '<4sHH'  magic, string count, group count
+#   strings  '<H' length + utf-8 bytes, each distinct string once
+#   groups   '<HH'    schedule key index, session count
+#   sessions '<10HB'  course_code, course_name, type, day, time, faculty, batch, slot, room, basket indices,
+#                     duration
+_MAGIC = b'TTS4'
+_HEADER = struct.Struct('<4sHH')
+_LEN = struct.Struct('<H')
+_GROUP = struct.Struct('<HH')
+_SESSION = struct.Struct('<10HB')
+_STRING_FIELDS = ('course_code', 'course_name', 'type', 'day', 'time', 'faculty', 'batch', 'slot', 'room', 'basket')
+
+
+def pack_schedule(schedule):
+    """Serialize a schedule to compact bytes (string table + fixed-width session rows)"""
+    index = {}
+
+    def ref(value):
+        value = str(value)
+        if value not in index:
+            index[value] = len(index)
+        return index[value]
+
+    body = bytearray()
+    for code, sessions in schedule.items():
+        body += _GROUP.pack(ref(code), len(sessions))
+        for s in sessions:
+            body += _SESSION.pack(*(ref(s.get(f) or '') for f in _STRING_FIELDS), int(s.get('duration', 1)))
+
+    out = bytearray(_HEADER.pack(_MAGIC, len(index), len(schedule)))
+    for value in index:
+        encoded = value.encode('utf-8')
+        out += _LEN.pack(len(encoded)) + encoded
+    out += body
+    return zlib.compress(bytes(out))
+
+
+def unpack_schedule(data):
+    """Inverse of pack_schedule"""
+    data = zlib.decompress(data)
+    magic, n_strings, n_groups = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError("Not a packed schedule")
+    offset = _HEADER.size
+
+    strings = []
+    for _ in range(n_strings):
+        (length,) = _LEN.unpack_from(data, offset)
+        offset += _LEN.size
+        strings.append(sys.intern(data[offset:offset + length].decode('utf-8')))
+        offset += length
+
+    schedule = defaultdict(list)
+    for _ in range(n_groups):
+        key, count = _GROUP.unpack_from(data, offset)
+        offset += _GROUP.size
+        sessions = schedule[strings[key]]
+        for _ in range(count):
+            *refs, duration = _SESSION.unpack_from(data, offset)
+            offset += _SESSION.size
+            code, name, type_, day, time, faculty, batch, slot, room, basket = (strings[r] for r in refs)
+            sessions.append(SessionRecord(code, name, type_, day, time, faculty, duration, batch, slot, room, basket))
+    return schedule
+
+
+def load_stored_schedule(value):
+    """Read a schedule kept in the Flask session (packed bytes, or JSON from older sessions)"""
+    if isinstance(value, (bytes, bytearray)):
+        return unpack_schedule(value)
+    return schedule_from_dicts(json.loads(value))
@@ -0,0 +1,93 @@
+"""Cold-start benchmark for the web app.
+
+    python startup_bench.py                      # 5 fresh interpreters per mode
+    python startup_bench.py --runs 10 --input data/newinput1.xlsx
+
+Every run starts a new Python process, imports app, then sends a first
+GET / and a first POST /generate through the Flask test client. Two modes
+are compared: 'lazy' (heavy modules load on the first request that needs
+them) and 'warmup' (TIMETABLE_WARMUP=1, app.warmup() runs at import, as a
+pre-fork server would do once before forking). The report gives the median
+import time, first-response times and the total time from process start to
+the first timetable.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# runs inside the fresh interpreter; prints one JSON line of timings
+_CHILD = r"""
+import json, sys, time
+from io import BytesIO
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+index = client.get('/')
+indexed = time.perf_counter()
+with open(sys.argv[1], 'rb') as f:
+    data = f.read()
+response = client.post('/generate', data={'file': (BytesIO(data), 'input.xlsx')},
+                       content_type='multipart/form-data')
+generated = time.perf_counter()
+print(json.dumps({'import_s': imported - start, 'first_index_s': indexed - imported,
+                  'first_generate_s': generated - indexed,
+                  'ok': index.status_code == 200 and 'X-Session-Id' in response.headers}))
+"""
+
+MODES = {'lazy': {'TIMETABLE_WARMUP': '0'}, 'warmup': {'TIMETABLE_WARMUP': '1'}}
+FIELDS = ('import_s', 'first_index_s', 'first_generate_s', 'total_s')
+
+
+def run_once(mode, input_path):
+    env = dict(os.environ, **MODES[mode])
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', _CHILD, str(input_path)], cwd=BASE_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result['total_s'] = time.perf_counter() - start  # interpreter start-up included
+    return result
+
+
+def bench(input_path, runs=5, modes=tuple(MODES)):
+    report = {}
+    for mode in modes:
+        samples = [run_once(mode, input_path) for _ in range(runs)]
+        report[mode] = {field: statistics.median(s[field] for s in samples) for field in FIELDS}
+        report[mode]['failed'] = sum(not s['ok'] for s in samples)
+    return report
+
+
+def print_report(report, runs):
+    print(f"median of {runs} cold starts (ms)")
+    print(f"{'mode':8} {'import':>9} {'first /':>9} {'first gen':>10} {'total':>9} {'failed':>7}")
+    for mode, row in report.items():
+        print(f"{mode:8} {row['import_s'] * 1000:9.1f} {row['first_index_s'] * 1000:9.1f} "
+              f"{row['first_generate_s'] * 1000:10.1f} {row['total_s'] * 1000:9.1f} {row['failed']:7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import and first-request latency of a fresh app process")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per mode")
+    parser.add_argument('--input', default=str(BASE_DIR / 'data' / 'newinput1.xlsx'), help="workbook for /generate")
+    parser.add_argument('--mode', choices=list(MODES), action='append', help="only these modes (repeatable)")
+    parser.add_argument('--json', metavar='PATH', help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = bench(args.input, args.runs, tuple(args.mode or MODES))
+    print_report(report, args.runs)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(row['failed'] for row in report.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
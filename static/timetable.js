@@ -0,0 +1,226 @@
+// Draws every batch timetable in the browser from the compact payload built by
+// visualizer.schedule_payload, and redraws locally after each drag and drop.
+// Saving posts only the moved sessions to /adjust (format=json) with the version
+// they were made on; undo and redo go through /history/<session id>. When the
+// timetable was changed elsewhere the server answers 409 with its current
+// version, which is drawn instead. The page provides:
+//   <script type="application/json" id="timetable-data">{"session_id": ..., "version": ..., "payload": ...}</script>
+//   <div id="timetable-root"></div>
+(function () {
+    'use strict';
+
+    const COLORS = {lab: '#e74c3c', practical: '#e74c3c', tutorial: '#9b59b6', lecture: '#3498db',
+                    core: '#2ecc71', elective: '#f39c12'};
+    const FIELDS = ['course_code', 'course_name', 'type', 'day', 'time', 'faculty', 'duration', 'batch',
+                    'slot', 'room', 'basket'];
+
+    let sessionId = '';
+    let version = 0;
+    let grid = null;
+    let sessions = [];   // one object per session, with start/end in minutes
+    let dirty = false;
+
+    function pad(n) { return String(n).padStart(2, '0'); }
+    function clock(minutes) { return pad(Math.floor(minutes / 60)) + ':' + pad(minutes % 60) + ':00'; }
+    function escapeHtml(text) {
+        return String(text).replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+    }
+
+    function record(s) {
+        const values = {key: s.key};
+        FIELDS.forEach(field => { values[field] = s[field]; });
+        values.time = clock(s.start) + ' - ' + clock(s.end);
+        return values;
+    }
+
+    function load(data) {
+        const payload = data.payload;
+        version = data.version || 0;
+        grid = payload.grid;
+        const strings = payload.strings;
+        sessions = payload.sessions.map(row => {
+            const s = {};
+            payload.columns.forEach((column, i) => {
+                s[column] = (column === 'start' || column === 'end' || column === 'duration') ? row[i] : strings[row[i]];
+            });
+            s.saved = record(s);  // as the server has it, to describe a move
+            return s;
+        });
+        dirty = false;
+    }
+
+    function cellOf(minutes) { return Math.floor((minutes - grid.start) / grid.slot_minutes); }
+    function spanOf(s) {
+        const first = Math.max(0, cellOf(s.start));
+        const last = Math.min(grid.labels.length, Math.ceil((s.end - grid.start) / grid.slot_minutes));
+        return Math.max(1, last - first);
+    }
+
+    // sessions that overlap another one with the same faculty, batch or room (basket courses share the batch)
+    function clashing() {
+        const marked = new Set();
+        const groups = new Map();
+        sessions.forEach((s, i) => {
+            ['faculty', 'batch', 'room'].forEach(field => {
+                if (!s[field]) return;
+                const key = field + '\u0000' + s[field] + '\u0000' + s.day;
+                if (!groups.has(key)) groups.set(key, []);
+                groups.get(key).push(i);
+            });
+        });
+        groups.forEach((members, key) => {
+            const isBatch = key.startsWith('batch\u0000');
+            members.sort((a, b) => sessions[a].start - sessions[b].start);
+            for (let x = 0; x < members.length; x++) {
+                const a = sessions[members[x]];
+                for (let y = x + 1; y < members.length && sessions[members[y]].start < a.end; y++) {
+                    const b = sessions[members[y]];
+                    if (isBatch && a.basket && a.basket === b.basket && a.course_code !== b.course_code) continue;
+                    marked.add(members[x]);
+                    marked.add(members[y]);
+                }
+            }
+        });
+        return marked;
+    }
+
+    function card(s, index, clash) {
+        const color = COLORS[(s.basket ? 'elective' : s.type).toLowerCase()] || '#7f8c8d';
+        return `<div class="course-card${clash ? ' conflict' : ''}" draggable="true" data-index="${index}" style="background:${color}">` +
+               `<div class="course-code">${escapeHtml(s.key)}</div>` +
+               `<div class="course-details">${escapeHtml(s.faculty)}${s.basket ? ' · ' + escapeHtml(s.basket) : ''}</div></div>`;
+    }
+
+    function batchTable(batch, indices, clashes) {
+        // cells[day][cell] = {span, cards}; sessions that do not get a cell of their own are listed below
+        const cells = {};
+        const hidden = [];
+        grid.days.forEach(day => { cells[day] = new Array(grid.labels.length).fill(null); });
+        indices.sort((a, b) => sessions[a].start - sessions[b].start).forEach(i => {
+            const s = sessions[i];
+            const row = cells[s.day];
+            const first = cellOf(s.start);
+            const span = spanOf(s);
+            if (!row || first < 0 || first >= grid.labels.length) { hidden.push(i); return; }
+            const here = row[first];
+            if (here && here.cards && s.basket && here.span === span && sessions[here.cards[0]].basket === s.basket) {
+                here.cards.push(i);  // electives of one basket share their cell
+                return;
+            }
+            for (let c = first; c < first + span; c++) {
+                if (row[c]) { hidden.push(i); return; }
+            }
+            row[first] = {span: span, cards: [i]};
+            for (let c = first + 1; c < first + span; c++) row[c] = {covered: true};
+        });
+
+        let html = `<h2>${escapeHtml(batch)} Year</h2>`;
+        if (hidden.length) {
+            html += '<div class="conflicts"><ul>' + hidden.map(i =>
+                `<li>${escapeHtml(sessions[i].key)} (${escapeHtml(sessions[i].day)} ${clock(sessions[i].start)}) is not shown: it overlaps another session or lies outside the grid</li>`
+            ).join('') + '</ul></div>';
+        }
+        html += '<div class="timetable-container"><table class="timetable"><thead><tr><th class="time-header">Day</th>';
+        html += grid.labels.map(label => `<th>${label}</th>`).join('') + '</tr></thead><tbody>';
+        grid.days.forEach(day => {
+            html += `<tr><td class="time-header"><strong>${escapeHtml(day)}</strong></td>`;
+            cells[day].forEach((cell, c) => {
+                if (cell && cell.covered) return;
+                const target = `class="drop-target" data-day="${escapeHtml(day)}" data-cell="${c}"`;
+                if (cell) {
+                    html += `<td colspan="${cell.span}" ${target}>` + cell.cards.map(i => card(sessions[i], i, clashes.has(i))).join('') + '</td>';
+                } else {
+                    html += `<td ${target}><div class="empty-slot">Available</div></td>`;
+                }
+            });
+            html += '</tr>';
+        });
+        return html + '</tbody></table></div>';
+    }
+
+    function render() {
+        const clashes = clashing();
+        const byBatch = new Map();
+        sessions.forEach((s, i) => {
+            if (!byBatch.has(s.batch)) byBatch.set(s.batch, []);
+            byBatch.get(s.batch).push(i);
+        });
+        const root = document.getElementById('timetable-root');
+        let html = `<div class="toolbar"><button id="tt-save"${dirty ? '' : ' disabled'}>Save changes</button> ` +
+                   '<button id="tt-undo">Undo</button> <button id="tt-redo">Redo</button> ' +
+                   `<span class="status">${clashes.size ? clashes.size + ' session(s) in a clash' : 'No clashes'}</span></div>`;
+        byBatch.forEach((indices, batch) => { html += batchTable(batch, indices, clashes); });
+        root.innerHTML = html;
+        bind(root);
+    }
+
+    function bind(root) {
+        let dragged = null;
+        root.querySelectorAll('.course-card').forEach(el => {
+            el.addEventListener('dragstart', () => { dragged = Number(el.dataset.index); el.style.opacity = '0.4'; });
+            el.addEventListener('dragend', () => { el.style.opacity = '1'; });
+        });
+        root.querySelectorAll('.drop-target').forEach(td => {
+            td.addEventListener('dragover', e => { e.preventDefault(); td.classList.add('highlight'); });
+            td.addEventListener('dragleave', () => td.classList.remove('highlight'));
+            td.addEventListener('drop', e => {
+                e.preventDefault();
+                if (dragged === null) return;
+                const s = sessions[dragged];
+                const start = grid.start + Number(td.dataset.cell) * grid.slot_minutes;
+                s.end = start + (s.end - s.start);
+                s.start = start;
+                s.day = td.dataset.day;
+                s.slot = '';  // moved off its slot master slot
+                dragged = null;
+                dirty = true;
+                render();
+            });
+        });
+        root.querySelector('#tt-save').addEventListener('click', save);
+        root.querySelector('#tt-undo').addEventListener('click', () => step('undo'));
+        root.querySelector('#tt-redo').addEventListener('click', () => step('redo'));
+    }
+
+    // the /adjust delta: every session whose place differs from the saved version
+    function deltaJson() {
+        const moved = [];
+        sessions.forEach(s => {
+            const now = record(s);
+            if (now.day === s.saved.day && now.time === s.saved.time && now.slot === s.saved.slot) return;
+            moved.push(Object.assign({}, s.saved, {to: {day: now.day, time: now.time, slot: now.slot}}));
+        });
+        return JSON.stringify({moved: moved});
+    }
+
+    function post(url, form) {
+        form.append('version', version);
+        form.append('format', 'json');
+        return fetch(url, {method: 'POST', body: form}).then(response =>
+            response.json().then(data => {
+                if (response.status === 409 && data.payload) { load(data); render(); }
+                if (!response.ok) throw new Error(data.error || response.statusText);
+                return data;
+            }));
+    }
+
+    function save() {
+        const form = new FormData();
+        form.append('session_id', sessionId);
+        form.append('delta', deltaJson());
+        post('/adjust', form).then(data => { load(data); render(); }).catch(e => alert(e.message));
+    }
+
+    function step(action) {
+        post(`/history/${encodeURIComponent(sessionId)}/${action}`, new FormData())
+            .then(data => { load(data); render(); })
+            .catch(e => alert(e.message));
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        const data = JSON.parse(document.getElementById('timetable-data').textContent);
+        sessionId = data.session_id;
+        load(data);
+        render();
+    });
+})();
@@ -0,0 +1,101 @@
+"""The teaching week as a grid of days x fixed-length cells.
+
+One TimeGrid is built per slot master and shared by the scheduler (cell
+bitmaps for availability), the optimizer (per-cell occupancy counts), the
+HTML preview (columns) and the Excel export (row order). Index lookups are
+precomputed so callers never scan day or time lists.
+"""
+from math import ceil, gcd
+
+from session_record import time_to_minutes
+
+WEEK = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+def _clock(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class TimeGrid:
+    def __init__(self, days=WEEK[:5], start=8 * 60, end=18 * 60, slot_minutes=60, break_minutes=5):
+        """days in display order; start/end in minutes; each cell is slot_minutes long
+        and its label ends break_minutes early (08:00 - 08:55 for hour cells)"""
+        if slot_minutes <= 0 or end <= start:
+            raise ValueError("Time grid needs a positive slot length and end after start")
+        self.days = tuple(days)
+        self.start = start
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = ceil((end - start) / slot_minutes)
+        self.end = start + self.slots_per_day * slot_minutes
+
+        self.day_index = {day: i for i, day in enumerate(self.days)}
+        self.starts = [start + i * slot_minutes for i in range(self.slots_per_day)]
+        label_length = slot_minutes - break_minutes if slot_minutes > break_minutes else slot_minutes
+        self.labels = [f"{_clock(m)} - {_clock(m + label_length)}" for m in self.starts]
+        # lower-cased day names and their 3-letter prefixes -> day
+        self._day_lookup = {}
+        for day in self.days:
+            self._day_lookup[day.lower()] = day
+            self._day_lookup.setdefault(day[:3].lower(), day)
+
+    @classmethod
+    def from_slot_master(cls, slot_master, break_minutes=5):
+        """Days, first start, last end and cell length (gcd of start offsets) from the slot table"""
+        present = set(slot_master['Day'])
+        days = [d for d in WEEK if d in present] + sorted(present - set(WEEK))
+        starts = [time_to_minutes(t) for t in slot_master['StartTime']]
+        ends = [time_to_minutes(t) for t in slot_master['EndTime']]
+        first = min(starts)
+        step = 0
+        for value in starts:
+            step = gcd(step, value - first)
+        if not step:
+            step = 60
+        return cls(days, first, max(ends) + break_minutes, step, break_minutes)
+
+    # --- lookups ---------------------------------------------------------------
+
+    def cell(self, minutes):
+        """Index of the cell a time falls in, or None outside the grid"""
+        if minutes < self.start or minutes >= self.end:
+            return None
+        return (minutes - self.start) // self.slot_minutes
+
+    def span(self, start, end):
+        """Cell indices touched by [start, end) minutes, clipped to the grid"""
+        first = max(0, (start - self.start) // self.slot_minutes)
+        last = min(self.slots_per_day, -(-(end - self.start) // self.slot_minutes))
+        return range(first, max(first, last))
+
+    def match_day(self, text):
+        """'Monday', 'monday' or 'Mon' -> 'Monday'; None if it is not a grid day"""
+        text = text.strip().lower()
+        return self._day_lookup.get(text) or self._day_lookup.get(text[:3])
+
+    def mask(self, day, start, end):
+        """Bitmap of the cells touched by [start, end) on day; one bit per cell of the week"""
+        index = self.day_index.get(day)
+        if index is None:
+            return 0
+        base = index * self.slots_per_day
+        mask = 0
+        for i in self.span(start, end):
+            mask |= 1 << (base + i)
+        return mask
+
+    def day_mask(self, day):
+        return self.mask(day, self.start, self.end)
+
+    def sort_key(self, day, minutes):
+        """Chronological key; days outside the grid sort last"""
+        return self.day_index.get(day, len(self.days)), minutes
+
+
+DEFAULT_GRID = TimeGrid()
+
+
+def grid_for(slot_master):
+    """Grid for a slot master frame, falling back to the default week when it is empty"""
+    if slot_master is None or slot_master.empty or slot_master['StartTime'].isna().all():
+        return DEFAULT_GRID
+    return TimeGrid.from_slot_master(slot_master)
@@ -3,16 +3,24 @@ import pandas as pd
 from io import BytesIO
 from typing import Dict, Any
 
+from analytics import write_analytics_sheets
+from conflicts import find_conflicts, conflict_keys
+from session_record import parse_time_range, schedule_from_dicts
+from timegrid import DEFAULT_GRID
+
 #creates an Excel file in memory (with two sheets schedule and faculty workload) from the given dictionary and return the file as bytes
-def generate_excel_bytes(schedule: dict) -> bytes:
-    """Generate Excel file in memory and return as bytes"""
+def generate_excel_bytes(schedule: dict, grid=DEFAULT_GRID, analytics=None) -> bytes:
+    """Generate Excel file in memory and return as bytes; rows run in week order of the grid.
+    analytics (analytics.analyze output) adds the utilization sheets."""
     output = BytesIO()
 
     # Create main schedule sheet
     schedule_list = []
     for course_code, sessions in schedule.items():
         for session in sessions:
+            start, _ = parse_time_range(session['time'])
             schedule_list.append({ #collecting all relevent information and adding to dictionary
+                '_order': grid.sort_key(session['day'], start),
                 'Course Code': course_code,
                 'Course Name': session.get('course_name', ''),
                 'Session Type': session['type'].capitalize(),
@@ -21,6 +29,7 @@ def generate_excel_bytes(schedule: dict) -> bytes:
                 'Faculty': session['faculty'],
                 'Room': session.get('room', ''),
                 'Batch': session.get('batch', ''),
+                'Basket': session.get('basket', ''),
                 'Duration (hrs)': session.get('duration', 1)
             })
 
@@ -33,12 +42,15 @@ def generate_excel_bytes(schedule: dict) -> bytes:
             faculty_hours[faculty] = faculty_hours.get(faculty, 0) + duration
 
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        schedule_list.sort(key=lambda row: row.pop('_order'))
         pd.DataFrame(schedule_list).to_excel(writer, sheet_name='Schedule', index=False)
         faculty_df = pd.DataFrame({
             'Faculty': list(faculty_hours.keys()),
             'Scheduled Hours': list(faculty_hours.values())
         })
         faculty_df.to_excel(writer, sheet_name='Faculty Workload', index=False)
+        if analytics is not None:
+            write_analytics_sheets(writer, analytics)
 
     return output.getvalue()
 
@@ -60,36 +72,23 @@ def get_session_color(session_type, color_map):
     return '#7f8c8d'
 
 
-def normalize_time(time_str):
-    if ':' not in time_str:
-        return time_str
-    parts = time_str.split(':')
-    hour = parts[0].zfill(2)
-    minute = parts[1][:2].zfill(2)
-    return f"{hour}:{minute}"
-
-
-def normalize_time_slot(slot):
-    if ' - ' in slot:
-        start, end = slot.split(' - ', 1)
-    else:
-        parts = slot.split('-')
-        start = parts[0].strip()
-        end = parts[1].strip() if len(parts) > 1 else ''
-    start_n = normalize_time(start)
-    end_n = normalize_time(end) if end else ''
-    if not end_n and start_n:
-        hr = int(start_n.split(':')[0])
-        end_n = f"{hr:02d}:55"
-    return f"{start_n} - {end_n}" if end_n else start_n
-
+def _minutes(value):
+    return f"{value // 60:02d}:{value % 60:02d}"
 
 
-def generate_time_slots():
-    return [f"{h:02d}:00 - {h:02d}:55" for h in range(8, 18)]
+def _conflict_panel(clashes, hidden) -> str:
+    """List clashes and sessions that overlap another card in this view"""
+    if not clashes and not hidden:
+        return ""
+    items = [f"<li>{c['type'].capitalize()} {c['resource']}: "
+             f"{' / '.join(x['course_code'] for x in c['sessions'])} on {c['day']} "
+             f"{_minutes(c['start'])}-{_minutes(c['end'])}</li>" for c in clashes]
+    items += [f"<li>{code} ({s['day']} {s['time']}) is not shown: it overlaps another session or lies outside the grid</li>"
+              for code, s in hidden]
+    return f"<div class='conflicts'><strong>{len(clashes)} conflict(s)</strong><ul>{''.join(items)}</ul></div>"
 
 
-def generate_html(schedule: dict) -> str:
+def generate_html(schedule: dict, grid=DEFAULT_GRID) -> str:
     color_map = {
         'lab': '#e74c3c', # lab or practical are same
         'practical': '#e74c3c',
@@ -98,29 +97,36 @@ def generate_html(schedule: dict) -> str:
         'core': '#2ecc71',
         'elective': '#f39c12'
     }
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-    all_slots = generate_time_slots()
+    days = grid.days
+    all_slots = grid.labels
 
     matrix = {day: {ts: None for ts in all_slots} for day in days} # initialize a tabel name matrix for each day and time slot
     occupied = {day: set() for day in days}
+    hidden = []  # sessions that could not get a cell of their own
+
+    clashes = find_conflicts(schedule)
+    clashing = conflict_keys(clashes)
 
     # Fill matrix with sessions
     for code, ses_list in schedule.items():
         for s in ses_list:
             day = s['day']
-            duration = s.get('duration', 1)
-            start_slot = normalize_time_slot(s['time'])
-            start_time = start_slot.split(' - ')[0]
-            time_index = [t.split(' - ')[0] for t in all_slots]
-            if start_time not in time_index:
-                continue  # ignore non-matching time
-            idx = time_index.index(start_time)
-            if idx + duration > len(all_slots):
-                continue  # skip overflow
+            start, end = parse_time_range(s['time'])
+            idx = grid.cell(start)
+            if day not in matrix or idx is None or grid.starts[idx] != start:
+                hidden.append((code, s))  # not on the grid
+                continue
+            duration = len(grid.span(start, end))  # cells covered, not hours
             span_slots = all_slots[idx:idx + duration]
+            cell = matrix[day][all_slots[idx]]
+            basket = s.get('basket')
+            if cell and basket and cell[1] == duration and cell[0][0][1].get('basket') == basket:
+                cell[0].append((code, s))  # electives of one basket share their cell
+                continue
             if any(ts in occupied[day] for ts in span_slots):
-                continue  # already occupied
-            matrix[day][all_slots[idx]] = {**s, 'course_code': code, 'duration': duration}
+                hidden.append((code, s))  # already occupied; reported below instead of dropped silently
+                continue
+            matrix[day][all_slots[idx]] = ([(code, s)], duration)  # keep the sessions themselves, no per-cell copy
             for ts in span_slots:
                 occupied[day].add(ts)
 
@@ -138,6 +144,8 @@ def generate_html(schedule: dict) -> str:
   .course-card {{padding: 8px; margin: 4px 0; border-radius: 6px; color: white; cursor: move;}}
   .empty-slot {{color: #aaa; font-size: 11px;}}
   .drop-target.highlight {{outline: 2px dashed #27ae60;}}
+  .course-card.conflict {{outline: 3px solid #c0392b;}}
+  .conflicts {{background: #fdecea; color: #922b21; border-radius: 8px; padding: 10px 16px; margin-bottom: 12px;}}
 
    .course-card {{
     padding: 6px;
@@ -153,6 +161,7 @@ def generate_html(schedule: dict) -> str:
 </style>
 </head><body>
 <div class="header"><h2>Timetable Preview</h2></div>
+{_conflict_panel(clashes, hidden)}
 <div class="timetable-container">
 <table class="timetable"><thead><tr><th class="time-header">Day</th>"""
 
@@ -167,13 +176,17 @@ def generate_html(schedule: dict) -> str:
             if skip > 0:
                 skip -= 1
                 continue
-            session = matrix[day][ts]
-            if session:
-                dur = session['duration']
-                color = get_session_color(session['type'], color_map)
+            cell = matrix[day][ts]
+            if cell:
+                cards, dur = cell
                 html += f"<td colspan='{dur}' class='drop-target' data-day='{day}' data-time='{ts}'>"
-                html += f"<div class='course-card' draggable='true' data-course='{session['course_code']}' data-type='{session['type']}' data-faculty='{session['faculty']}' data-duration='{dur}' style='background:{color}'>"
-                html += f"<div class='course-code'>{session['course_code']}</div><div class='course-details'>{session['faculty']}</div></div></td>"
+                for code, session in cards:
+                    basket = session.get('basket')
+                    color = get_session_color('elective' if basket else session['type'], color_map)
+                    clash = ' conflict' if (code, day, session['time']) in clashing else ''
+                    html += f"<div class='course-card{clash}' draggable='true' data-course='{code}' data-type='{session['type']}' data-faculty='{session['faculty']}' data-duration='{dur}' data-basket='{basket or ''}' style='background:{color}'>"
+                    html += f"<div class='course-code'>{code}</div><div class='course-details'>{session['faculty']}{f' · {basket}' if basket else ''}</div></div>"
+                html += "</td>"
                 skip = dur - 1
             else:
                 html += f"<td class='drop-target' data-day='{day}' data-time='{ts}'><div class='empty-slot'>Available</div></td>"
@@ -393,7 +406,41 @@ def generate_html(schedule: dict) -> str:
 
 
 
-def generate_html_per_batch(schedule: dict) -> dict:
+# one integer row per session in schedule_payload; text columns are indices into 'strings'
+PAYLOAD_COLUMNS = ('key', 'course_code', 'course_name', 'type', 'day', 'start', 'end', 'faculty', 'duration',
+                   'batch', 'slot', 'room', 'basket')
+_PAYLOAD_NUMBERS = {'start', 'end', 'duration'}
+
+
+def schedule_payload(schedule: dict, grid=DEFAULT_GRID) -> dict:
+    """Compact JSON form of a schedule for static/timetable.js, which draws every batch grid in the browser.
+
+    Each distinct string is sent once; sessions are rows of string indices and minutes.
+    """
+    strings, index = [], {}
+
+    def ref(value):
+        value = str(value or '')
+        if value not in index:
+            index[value] = len(strings)
+            strings.append(value)
+        return index[value]
+
+    rows = []
+    for key, sessions in schedule_from_dicts(schedule).items():
+        for s in sessions:
+            values = dict(s.to_dict(), key=key, start=s.start, end=s.end)
+            rows.append([values[c] if c in _PAYLOAD_NUMBERS else ref(values[c]) for c in PAYLOAD_COLUMNS])
+    return {
+        'grid': {'days': list(grid.days), 'start': grid.start, 'slot_minutes': grid.slot_minutes,
+                 'labels': grid.labels},
+        'columns': list(PAYLOAD_COLUMNS),
+        'strings': strings,
+        'sessions': rows,
+    }
+
+
+def generate_html_per_batch(schedule: dict, grid=DEFAULT_GRID) -> dict:
     """Generate separate HTML for each batch year"""
     from collections import defaultdict
 
@@ -403,5 +450,5 @@ def generate_html_per_batch(schedule: dict) -> dict:
             batch = session['batch'] # groups all session by course code
             batch_grouped[batch][course_code].append(session)
 
-    return {batch: generate_html(batch_schedule) for batch, batch_schedule in batch_grouped.items()}
+    return {batch: generate_html(batch_schedule, grid) for batch, batch_schedule in batch_grouped.items()}
 
@@ -0,0 +1,168 @@
+"""What-if capacity planning: one course load scheduled against several slot-master variants.
+
+    python whatif.py data/newinput1.xlsx variants/extra_lab.xlsx variants/new_group.xlsx
+    python whatif.py courses.xlsx v1.xlsx v2.xlsx -j 2 --groups --json whatif.json
+
+The course workbook is parsed once and handed to each worker process once
+(pool initializer), not once per variant. Every variant is scheduled in its
+own task through pipeline.schedule_courses, which reads that slot master and
+compiles its slot groups, time grid and faculty bitmaps once, and is scored
+with analytics.analyze. The current data/slot_master.xlsx runs as the
+'baseline' column unless --no-baseline is given. The report puts the
+variants side by side: slots offered, placed and unplaced hours, courses
+that fell back to session-by-session placement and slot utilization,
+followed by the courses each variant places or loses against the first column.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pipeline import SLOT_MASTER_PATH, load_slot_master, load_time_grid, schedule_courses
+
+_courses = None  # the parsed course table, set once per worker process
+
+
+def _init_worker(courses):
+    global _courses
+    _courses = courses
+
+
+def _run_variant(name, slot_master_path, optimize_seconds=0):
+    """Schedule the worker's courses on one slot master; errors come back as data"""
+    from analytics import analyze
+    try:
+        schedule, stats = schedule_courses(_courses, slot_master_path, optimize_seconds=optimize_seconds,
+                                           decompose_workers=0)
+        slot_master = load_slot_master(slot_master_path)
+        report = analyze(schedule, slot_master, load_time_grid(slot_master_path))
+    except Exception as e:
+        return name, {'slot_master': str(slot_master_path), 'error': str(e)}
+    return name, {
+        'slot_master': str(slot_master_path),
+        'slots': len(slot_master),
+        'slot_hours': int(slot_master['Duration'].sum()),
+        'slots_used': sum(group['used'] for group in report['slot_groups']),
+        'sessions': stats['sessions'],
+        'required_hours': stats['required_hours'],
+        'scheduled_hours': stats['scheduled_hours'],
+        'unplaced_hours': stats['unplaced_hours'],
+        'unplaced_courses': len(stats['unplaced']),
+        'fallback_courses': stats['fallback_courses'],
+        'utilization': report['utilization']['overall'],
+        'idle_gap_hours': sum(batch['idle_gap_hours'] for batch in report['batches']),
+        'faculty_cv': round(report['faculty_balance']['coefficient_of_variation'], 3),
+        'slot_groups': {group['group']: group['fill_rate'] for group in report['slot_groups']},
+        'unplaced': [f"{u['course_code']} ({u['batch']})" for u in stats['unplaced']],
+    }
+
+
+def variant_names(paths):
+    """Column names from file stems, numbered when two variants share a stem"""
+    names = []
+    for path in paths:
+        name = stem = Path(path).stem
+        n = 2
+        while name in names:
+            name = f'{stem}-{n}'
+            n += 1
+        names.append(name)
+    return names
+
+
+def compare(courses, variants, workers=None, optimize_seconds=0):
+    """Schedule courses on every (name, slot master path) variant in parallel; {name: summary} in input order"""
+    names = [name for name, _ in variants]
+    workers = min(workers or os.cpu_count() or 1, len(variants))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(courses,)) as pool:
+        results = dict(pool.map(_run_variant, names, [path for _, path in variants],
+                                [optimize_seconds] * len(variants)))
+    return {name: results[name] for name in names}
+
+
+# (label, summary key, format) rows of the side-by-side table
+ROWS = [
+    ('slots offered', 'slots', '{}'),
+    ('slot hours', 'slot_hours', '{}'),
+    ('slots used', 'slots_used', '{}'),
+    ('utilization', 'utilization', '{:.1%}'),
+    ('sessions', 'sessions', '{}'),
+    ('placed hours', 'scheduled_hours', '{}'),
+    ('unplaced hours', 'unplaced_hours', '{}'),
+    ('unplaced courses', 'unplaced_courses', '{}'),
+    ('fallback courses', 'fallback_courses', '{}'),
+    ('batch idle hours', 'idle_gap_hours', '{:g}'),
+    ('faculty load CV', 'faculty_cv', '{}'),
+]
+
+
+def _cell(summary, key, fmt):
+    value = summary.get(key)
+    return '-' if value is None else fmt.format(value)
+
+
+def print_report(report, groups=False):
+    names = list(report)
+    width = max([12] + [len(name) for name in names])
+    print(f"{'':18}" + ''.join(f' {name:>{width}}' for name in names))
+    for label, key, fmt in ROWS:
+        print(f'{label:18}' + ''.join(f' {_cell(report[name], key, fmt):>{width}}' for name in names))
+
+    if groups:
+        all_groups = sorted({g for s in report.values() for g in s.get('slot_groups', {})})
+        print('\nslot group fill rate')
+        for group in all_groups:
+            print(f'{group:18}' + ''.join(f" {_cell(report[name].get('slot_groups', {}), group, '{:.0%}'):>{width}}"
+                                          for name in names))
+
+    for name, summary in report.items():
+        if 'error' in summary:
+            print(f"\n{name}: failed: {summary['error']}")
+    base_name, base = names[0], report[names[0]]
+    for name in names[1:]:
+        summary = report[name]
+        if 'error' in summary or 'error' in base:
+            continue
+        placed = sorted(set(base['unplaced']) - set(summary['unplaced']))
+        lost = sorted(set(summary['unplaced']) - set(base['unplaced']))
+        if placed or lost:
+            print(f'\n{name} vs {base_name}:')
+            if placed:
+                print('  now placed:   ' + ', '.join(placed))
+            if lost:
+                print('  now unplaced: ' + ', '.join(lost))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Schedule one course workbook against several slot masters")
+    parser.add_argument('courses', help="course workbook (same format as the upload template)")
+    parser.add_argument('variants', nargs='+', help="slot master workbooks to compare")
+    parser.add_argument('--baseline', default=str(SLOT_MASTER_PATH),
+                        help="slot master shown as the first column (default: the app's slot master)")
+    parser.add_argument('--no-baseline', action='store_true', help="only compare the given variants")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="parallel worker processes")
+    parser.add_argument('--optimize', type=float, default=0, metavar='SECONDS',
+                        help="run the local-search quality pass for up to SECONDS per variant")
+    parser.add_argument('--groups', action='store_true', help="also list the fill rate of every slot group")
+    parser.add_argument('--json', metavar='PATH', help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    from data_loader import load_courses_from_minimal_format as load_courses
+    courses = load_courses(args.courses)
+    if args.no_baseline:
+        paths, names = args.variants, variant_names(args.variants)
+    else:
+        paths, names = [args.baseline] + args.variants, variant_names(['baseline'] + args.variants)
+    report = compare(courses, list(zip(names, paths)), args.workers, args.optimize)
+
+    print_report(report, args.groups)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if any('error' in summary for summary in report.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())